@@ -8,4 +8,14 @@ class Derivative:
         self.position_type = position_type
         self.contract_size = contract_size
         self.multiplier = multiplier
-        self.payoff = 0
\ No newline at end of file
+        self.payoff = 0
+
+    # +1 for a long and -1 for a short position
+    def get_position_sign(self):
+        if self.position_type == 'Long':
+            return 1
+        elif self.position_type == 'Short':
+            return -1
+        else:
+            print("Please give either Long or Short for the position type")
+            return 0
@@ -0,0 +1,240 @@
+import io
+import os
+import csv
+import json
+import shutil
+import hashlib
+from numpy import *
+from numpy.lib import format as npy_format
+from Derivatives.Pricing.Volatility import VolatilityEstimator
+from Derivatives.Options.PlainVanillaOption import PlainVanillaOption
+from Derivatives.Options.BarrierOption import BarrierOption
+
+# Default price history shipped with the project: daily closing prices of the Athens General Index
+# and its constituents, one column per ticker and one row per day (newest first in the file)
+DEFAULT_DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'stocks_data.csv')
+
+# Daily price history of a set of tickers.
+# The csv file is parsed once into a (days x tickers) float32 matrix sorted from the oldest to the newest day,
+# with the dd/mm/yyyy dates turned into datetime64 days, and saved next to it as .npy files with a small json
+# file describing the source (modification time, size and SHA-256 hash) and the number of days. Later loads
+# memory-map the .npy files instead of parsing the csv again, so the columns of the tickers are views on the file
+# pages (no copy). The cache is rebuilt when the csv changes. New days can be appended to the cache without parsing
+# the csv again.
+# Files are never rewritten in place: a new version is written next to the old one and renamed over it, the
+# metadata last. The .npy files only ever grow at the end, so mapping the number of days of the metadata from each
+# of them gives matching dates and prices even while another process is between the two renames of an append,
+# or after it crashed there.
+# The volatility estimators fitted on the history are kept and updated with every appended day
+class MarketData:
+
+    def __init__(self, file_name=DEFAULT_DATA_FILE, use_cache=True):
+        self.file_name = file_name
+        self.use_cache = use_cache
+        base_name = os.path.splitext(file_name)[0]
+        self.prices_file = base_name + '.prices.npy'
+        self.dates_file = base_name + '.dates.npy'
+        self.metadata_file = base_name + '.cache.json'
+        self.estimators = {}
+        if use_cache:
+            self.load()
+        else:
+            self.tickers, self.dates, self.prices = self.parse_csv(file_name)
+
+    # Method that reads the csv file: a Date column in dd/mm/yyyy followed by one column of prices per ticker
+    def parse_csv(self, file_name):
+        with open(file_name, newline='') as data_file:
+            reader = csv.reader(data_file)
+            header = next(reader)
+            rows = [row for row in reader if row]
+        tickers = header[1:]
+        dates = array(['%s-%s-%s' % (row[0][6:10], row[0][3:5], row[0][0:2]) for row in rows], dtype='datetime64[D]')
+        prices = array([row[1:] for row in rows], dtype=float32)
+        order = argsort(dates, kind='stable')
+        return tickers, dates[order], ascontiguousarray(prices[order])
+
+    # Modification time, size and SHA-256 hash of the csv file
+    def get_source_key(self, with_hash=True):
+        status = os.stat(self.file_name)
+        key = {'mtime_ns': status.st_mtime_ns, 'size': status.st_size}
+        if with_hash:
+            digest = hashlib.sha256()
+            with open(self.file_name, 'rb') as data_file:
+                for block in iter(lambda: data_file.read(1 << 20), b''):
+                    digest.update(block)
+            key['sha256'] = digest.hexdigest()
+        return key
+
+    # Method that memory-maps the cache, after (re)building it from the csv when it is missing or out of date.
+    # An unchanged modification time and size are trusted, otherwise the hash of the csv decides
+    def load(self):
+        metadata = None
+        if os.path.exists(self.metadata_file) and os.path.exists(self.prices_file) and os.path.exists(self.dates_file):
+            with open(self.metadata_file) as metadata_file:
+                metadata = json.load(metadata_file)
+            source = self.get_source_key(with_hash=False)
+            if (source['mtime_ns'], source['size']) != (metadata['source']['mtime_ns'], metadata['source']['size']):
+                source = self.get_source_key()
+                if source['sha256'] == metadata['source']['sha256']:
+                    # touched but unchanged, remember the new modification time
+                    metadata['source'] = source
+                    self.save_metadata(metadata)
+                else:
+                    metadata = None
+        if metadata is None or 'days' not in metadata or not self.map_cache(metadata['days']):
+            self.rebuild_cache()
+        else:
+            self.tickers = metadata['tickers']
+            self.metadata = metadata
+
+    # Method that parses the csv file and writes the cache
+    def rebuild_cache(self):
+        tickers, dates, prices = self.parse_csv(self.file_name)
+        self.save_npy(self.dates_file, dates)
+        self.save_npy(self.prices_file, prices)
+        self.metadata = {'source': self.get_source_key(), 'tickers': tickers, 'days': len(dates)}
+        self.save_metadata(self.metadata)
+        self.tickers = tickers
+        self.map_cache(len(dates))
+
+    # Temporary file next to a cache file (same directory, so that the rename is atomic), unique per process
+    def get_temporary_file(self, file_name):
+        return '%s.%d.tmp' % (file_name, os.getpid())
+
+    # Method that writes an array to a .npy file through a temporary file renamed over it
+    def save_npy(self, npy_file, data):
+        temporary_file = self.get_temporary_file(npy_file)
+        with open(temporary_file, 'wb') as cache_file:
+            save(cache_file, data)
+        os.replace(temporary_file, npy_file)
+
+    def save_metadata(self, metadata):
+        temporary_file = self.get_temporary_file(self.metadata_file)
+        with open(temporary_file, 'w') as metadata_file:
+            json.dump(metadata, metadata_file)
+        os.replace(temporary_file, self.metadata_file)
+
+    # Method that memory-maps the first days rows of the cache files, False when one of them is shorter
+    def map_cache(self, days):
+        dates = load(self.dates_file, mmap_mode='r')
+        prices = load(self.prices_file, mmap_mode='r')
+        if len(dates) < days or len(prices) < days:
+            return False
+        self.dates, self.prices = dates[:days], prices[:days]
+        return True
+
+    # Method that appends new days (later than the last one) to the price history: dates in dd/mm/yyyy or datetime64
+    # and one row of prices per date with a price per ticker. With the cache both .npy files are grown into temporary
+    # files, renamed over the old ones and then the metadata gets the new number of days; the csv file is left as it is
+    def append_prices(self, dates, prices):
+        dates = atleast_1d(asarray([date if not isinstance(date, str) else '%s-%s-%s' % (date[6:10], date[3:5], date[0:2])
+                                    for date in atleast_1d(dates)], dtype='datetime64[D]'))
+        prices = atleast_2d(asarray(prices, dtype=float32))
+        if prices.shape != (len(dates), len(self.tickers)):
+            print("Please give one price per ticker for every new date")
+            return
+        if len(self.dates) and dates.min() <= self.dates[-1]:
+            print("Please give only dates after the last date of the price history")
+            return
+        order = argsort(dates, kind='stable')
+        dates, prices = dates[order], prices[order]
+
+        for estimator in self.estimators.values():
+            for row in prices:
+                estimator.update(row)
+
+        if not self.use_cache:
+            self.dates = concatenate((self.dates, dates))
+            self.prices = concatenate((self.prices, prices))
+            return
+
+        days = len(self.dates) + len(dates)
+        temporary_dates_file = self.append_npy(self.dates_file, len(self.dates), dates)
+        temporary_prices_file = self.append_npy(self.prices_file, len(self.dates), prices)
+        # release the memory maps before replacing the files
+        self.dates, self.prices = None, None
+        os.replace(temporary_dates_file, self.dates_file)
+        os.replace(temporary_prices_file, self.prices_file)
+        self.metadata['days'] = days
+        self.save_metadata(self.metadata)
+        self.map_cache(days)
+
+    # Write the first days rows of a C-ordered .npy file followed by new rows to a temporary file, returned for the
+    # caller to rename over the old one. The file is copied and the rows go at its end, only the header is rewritten
+    # (while the new shape fits in its padding, otherwise the whole array is saved again)
+    def append_npy(self, npy_file, days, rows):
+        with open(npy_file, 'rb') as cache_file:
+            version = npy_format.read_magic(cache_file)
+            if version == (1, 0):
+                shape, fortran_order, data_type = npy_format.read_array_header_1_0(cache_file)
+            else:
+                shape, fortran_order, data_type = npy_format.read_array_header_2_0(cache_file)
+            header_size = cache_file.tell()
+        rows = ascontiguousarray(rows, dtype=data_type)
+        new_shape = (days + rows.shape[0],) + tuple(shape[1:])
+
+        header = io.BytesIO()
+        description = {'descr': npy_format.dtype_to_descr(data_type), 'fortran_order': False, 'shape': new_shape}
+        if version == (1, 0):
+            npy_format.write_array_header_1_0(header, description)
+        else:
+            npy_format.write_array_header_2_0(header, description)
+        header = header.getvalue()
+
+        temporary_file = self.get_temporary_file(npy_file)
+        if len(header) == header_size and not fortran_order:
+            shutil.copyfile(npy_file, temporary_file)
+            with open(temporary_file, 'r+b') as cache_file:
+                # rows past days are left over from an append that crashed before its metadata was written
+                cache_file.truncate(header_size + days * data_type.itemsize * int(prod(shape[1:])))
+                cache_file.seek(0, os.SEEK_END)
+                cache_file.write(rows.tobytes())
+                cache_file.seek(0)
+                cache_file.write(header)
+        else:
+            with open(temporary_file, 'wb') as cache_file:
+                save(cache_file, concatenate((load(npy_file, mmap_mode='r')[:days], rows)))
+        return temporary_file
+
+    # Column of prices of one ticker, a view on the price matrix
+    def get_prices(self, ticker):
+        if ticker not in self.tickers:
+            print("Please give one of the tickers", ', '.join(self.tickers))
+        return self.prices[:, self.tickers.index(ticker)]
+
+    # Log returns over horizon days (overlapping windows) of one ticker or, by default, of all of them.
+    # With window only the returns of the last window days are kept
+    def get_log_returns(self, ticker=None, horizon=1, window=None):
+        prices = self.prices if ticker is None else self.get_prices(ticker)
+        log_prices = log(asarray(prices, dtype=float64))
+        returns = (log_prices[horizon:] - log_prices[:-horizon]).astype(float32)
+        if window is not None:
+            returns = returns[-window:]
+        return returns
+
+    # Annualized volatility of every ticker with the rolling, ewma or garch estimator, see VolatilityEstimator.
+    # The estimator is fitted on the whole history the first time and then kept up to date by append_prices
+    def get_volatilities(self, method='ewma', **settings):
+        key = (method,) + tuple(sorted(settings.items()))
+        if key not in self.estimators:
+            estimator = VolatilityEstimator(method, **settings)
+            estimator.fit(self.prices)
+            self.estimators[key] = estimator
+        return self.estimators[key].get_volatility()
+
+    # Volatility of one ticker, see get_volatilities
+    def get_volatility(self, ticker, method='ewma', **settings):
+        if ticker not in self.tickers:
+            print("Please give one of the tickers", ', '.join(self.tickers))
+        return float(self.get_volatilities(method, **settings)[self.tickers.index(ticker)])
+
+    # Method that builds an option on a ticker, with the last price as spot price and the estimated volatility.
+    # With a barrier_type a BarrierOption is built, otherwise a PlainVanillaOption
+    def create_option(self, ticker, K, T, r, option_type, position_type, contract_size, multiplier, method='ewma',
+                      barrier_type=None, barrier=None, q=0, rebate=0, **settings):
+        S0 = float(self.get_prices(ticker)[-1])
+        s = self.get_volatility(ticker, method, **settings)
+        if barrier_type is None:
+            return PlainVanillaOption(S0, K, T, r, s, option_type, position_type, contract_size, multiplier)
+        return BarrierOption(S0, K, T, r, s, option_type, position_type, contract_size, multiplier,
+                             barrier_type, barrier, q, rebate)
@@ -0,0 +1,247 @@
+from numpy import *
+from Derivatives.Options.PlainVanillaOption import PlainVanillaOption
+from Derivatives.Options.BarrierOption import BarrierOption
+from Derivatives.Pricing.BlackScholes import calculate_option_price_BS_batch, calculate_option_greeks_BS_batch
+from Derivatives.Pricing.BarrierBlackScholes import (BARRIER_TYPES, calculate_barrier_option_price_BS_batch,
+                                                     calculate_barrier_option_greeks_BS_batch)
+
+# One record per contract: the contract data of the Option objects, the index of its market data (spot price,
+# rate, volatility and dividend yield) in the table of underlyings, the option and position types as signs
+# (+1 call/Long, -1 put/Short) and the barrier type as its position in BARRIER_TYPES (-1 for plain vanilla options).
+# Contract sizes and multipliers are whole numbers, exact in float32. The payoff tables and Greeks are not stored,
+# they are computed for the whole book on demand
+BOOK_DTYPE = dtype([('K', float64), ('T', float64), ('barrier', float64), ('rebate', float64), ('price', float64),
+                    ('contract_size', float32), ('multiplier', float32), ('underlying', int32),
+                    ('option_type', int8), ('position_type', int8), ('barrier_type', int8)])
+
+# One record per distinct set of market data, shared by all the contracts on it
+UNDERLYING_DTYPE = dtype([('S0', float64), ('r', float64), ('s', float64), ('q', float64)])
+
+# Fields of a contract as seen on the Option objects
+OPTION_FIELDS = ('S0', 'K', 'T', 'r', 's', 'q', 'barrier', 'rebate', 'contract_size', 'multiplier', 'price',
+                 'option_type', 'position_type', 'barrier_type')
+
+OPTION_TYPES = {'call': 1, 'put': -1}
+POSITION_TYPES = {'Long': 1, 'Short': -1}
+
+
+# Lightweight view on one contract of an OptionBook, reads and writes go straight to the book's arrays.
+# The option, position and barrier types are shown with the same names as on the Option objects. Writing a market
+# field moves the contract to the underlying with the new market data, the other contracts keep theirs
+class OptionView:
+    __slots__ = ('book', 'index')
+
+    def __init__(self, book, index):
+        object.__setattr__(self, 'book', book)
+        object.__setattr__(self, 'index', index)
+
+    def __getattr__(self, name):
+        if name not in OPTION_FIELDS:
+            raise AttributeError(name)
+        if name in UNDERLYING_DTYPE.names:
+            return float(self.book.underlyings[name][self.book.contracts['underlying'][self.index]])
+        value = self.book.contracts[name][self.index]
+        if name == 'option_type':
+            return 'call' if value == 1 else 'put'
+        if name == 'position_type':
+            return 'Long' if value == 1 else 'Short'
+        if name == 'barrier_type':
+            return BARRIER_TYPES[value] if value >= 0 else None
+        return float(value)
+
+    def __setattr__(self, name, value):
+        if name not in OPTION_FIELDS:
+            raise AttributeError(name)
+        if name in UNDERLYING_DTYPE.names:
+            market = self.book.underlyings[self.book.contracts['underlying'][self.index]].copy()
+            market[name] = value
+            self.book.contracts['underlying'][self.index] = self.book.get_underlying_indices(*market.tolist())[0]
+            return
+        if name == 'option_type':
+            value = OPTION_TYPES[value]
+        elif name == 'position_type':
+            value = POSITION_TYPES[value]
+        elif name == 'barrier_type':
+            value = BARRIER_TYPES.index(value) if value is not None else -1
+        self.book.contracts[name][self.index] = value
+
+    def __repr__(self):
+        return 'OptionView(%s)' % ', '.join('%s=%r' % (name, getattr(self, name)) for name in OPTION_FIELDS)
+
+
+# Columnar book of plain vanilla and barrier options.
+# The contracts live in one structured NumPy array that grows by doubling, their market data in a table of
+# underlyings stored once for all the contracts on the same underlying, so a book of a million contracts takes
+# 55 bytes per contract (about 55 MB) and the vectorized pricers run on its columns directly
+class OptionBook:
+
+    def __init__(self, name, capacity=1024):
+        self.name = name
+        self.contracts = zeros(capacity, dtype=BOOK_DTYPE)
+        self.size = 0
+        self.underlyings = zeros(0, dtype=UNDERLYING_DTYPE)
+        self.underlying_indices = {}
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index = index + self.size
+        if not 0 <= index < self.size:
+            raise IndexError('contract index out of range')
+        return OptionView(self, index)
+
+    def __iter__(self):
+        for index in range(self.size):
+            yield OptionView(self, index)
+
+    # Column of a contract field for the contracts of the book, a view on the book's array (no copy).
+    # The market fields S0, r, s and q are gathered from the table of underlyings (a copy)
+    def get_column(self, name):
+        if name in UNDERLYING_DTYPE.names:
+            return self.underlyings[name][self.contracts['underlying'][:self.size]]
+        return self.contracts[name][:self.size]
+
+    # Indices in the table of underlyings of arrays (or scalars) of market data, new sets of market data are added.
+    # Every distinct set is looked up once
+    def get_underlying_indices(self, S0, r, s, q):
+        market = stack([ravel(x) for x in broadcast_arrays(*(asarray(x, dtype=float64) for x in (S0, r, s, q)))], axis=1)
+        unique_market, inverse = unique(market, axis=0, return_inverse=True)
+        indices = empty(len(unique_market), dtype=int32)
+        new = []
+        for i, key in enumerate(map(tuple, unique_market.tolist())):
+            if key not in self.underlying_indices:
+                self.underlying_indices[key] = len(self.underlyings) + len(new)
+                new.append(key)
+            indices[i] = self.underlying_indices[key]
+        if new:
+            self.underlyings = concatenate((self.underlyings, array(new, dtype=UNDERLYING_DTYPE)))
+        return indices[inverse.ravel()]
+
+    # Method that makes room for n more contracts
+    def reserve(self, n):
+        if self.size + n > len(self.contracts):
+            capacity = len(self.contracts) * 2 if len(self.contracts) else 1
+            while capacity < self.size + n:
+                capacity = capacity * 2
+            contracts = zeros(capacity, dtype=BOOK_DTYPE)
+            contracts[:self.size] = self.contracts[:self.size]
+            self.contracts = contracts
+
+    # Method that adds arrays of contracts in one go, every argument may be a scalar or an array.
+    # barrier_type=None (or None entries) gives plain vanilla options. Returns the indices of the new contracts
+    def add_contracts(self, S0, K, T, r, s, option_type, position_type, contract_size, multiplier,
+                      barrier_type=None, barrier=nan, q=0.0, rebate=0.0):
+        option_type = self.get_codes(option_type, OPTION_TYPES, "Give a proper option type")
+        position_type = self.get_codes(position_type, POSITION_TYPES, "Please give either Long or Short for the position type")
+        barrier_type = self.get_codes(barrier_type, dict(zip(BARRIER_TYPES + (None,), (0, 1, 2, 3, -1))),
+                                      "Please give a barrier type of down-and-in, down-and-out, up-and-in or up-and-out")
+        n = broadcast(*(asarray(x) for x in (S0, K, T, r, s, option_type, position_type, contract_size, multiplier,
+                                               barrier_type, barrier, q, rebate))).size
+
+        underlying = self.get_underlying_indices(S0, r, s, q)
+        self.reserve(n)
+        new = self.contracts[self.size:self.size + n]
+        fields = {'K': K, 'T': T, 'barrier': barrier, 'rebate': rebate, 'price': 0.0,
+                  'contract_size': contract_size, 'multiplier': multiplier, 'underlying': underlying,
+                  'option_type': option_type, 'position_type': position_type, 'barrier_type': barrier_type}
+        for name, value in fields.items():
+            new[name] = value
+        indices = arange(self.size, self.size + n)
+        self.size = self.size + n
+        return indices
+
+    # Method that adds one contract, returns its view
+    def add_contract(self, S0, K, T, r, s, option_type, position_type, contract_size, multiplier,
+                     barrier_type=None, barrier=nan, q=0.0, rebate=0.0):
+        index = self.add_contracts(S0, K, T, r, s, option_type, position_type, contract_size, multiplier,
+                                   barrier_type, barrier, q, rebate)[0]
+        return OptionView(self, index)
+
+    # Method that copies a PlainVanillaOption or BarrierOption object into the book
+    def add_product(self, product):
+        if isinstance(product, BarrierOption):
+            return self.add_contract(product.S0, product.K, product.T, product.r, product.s, product.option_type,
+                                     product.position_type, product.contract_size, product.multiplier,
+                                     product.barrier_type, product.barrier, product.q, product.rebate)
+        elif isinstance(product, PlainVanillaOption):
+            return self.add_contract(product.S0, product.K, product.T, product.r, product.s, product.option_type,
+                                     product.position_type, product.contract_size, product.multiplier)
+        else:
+            print("Only plain vanilla and barrier options can be held in an option book")
+
+    # Integer codes of an array of type names (or of a single name), integer arrays are taken as the codes themselves.
+    # Every distinct name is looked up once, None stands for a missing type
+    def get_codes(self, names, codes, message):
+        names = asarray(names)
+        if names.dtype.kind in 'iu':
+            return names.astype(int8)
+        if names.dtype == object:
+            names = where(names == None, '', names).astype(str)
+        unique_names, inverse = unique(names, return_inverse=True)
+        keys = [str(name) if name != '' else None for name in unique_names]
+        if [key for key in keys if key not in codes]:
+            print(message)
+        lookup = array([codes.get(key, 0) for key in keys], dtype=int8)
+        return lookup[inverse].reshape(names.shape)
+    
+    # Signed number of options held per contract
+    def get_position(self):
+        return self.get_column('position_type') * self.get_column('contract_size').astype(float64) * self.get_column('multiplier')
+
+    # Arguments of the vectorized pricers for the contracts selected by a mask, S0 and s replace the book's own
+    def get_pricer_arguments(self, mask, barrier, S0=None, s=None):
+        columns = self.contracts[:self.size][mask]
+        market = self.underlyings[columns['underlying']]
+        arguments = (market['S0'] if S0 is None else S0, columns['K'], columns['T'], market['r'],
+                     market['s'] if s is None else s, columns['option_type'])
+        if barrier:
+            arguments = arguments + (columns['barrier_type'], columns['barrier'], market['q'], columns['rebate'])
+        return arguments
+
+    # Method that prices every contract of the book with the vectorized closed-end formulas,
+    # one pass for the plain vanilla options and one for the barrier options. The prices are stored in the price column
+    def calculate_option_prices_BS(self, S0=None, s=None):
+        barrier = self.get_column('barrier_type') >= 0
+        prices = self.get_column('price')
+        if (~barrier).any():
+            prices[~barrier] = calculate_option_price_BS_batch(*self.get_pricer_arguments(~barrier, False, S0, s))
+        if barrier.any():
+            prices[barrier] = calculate_barrier_option_price_BS_batch(*self.get_pricer_arguments(barrier, True, S0, s))
+        return prices
+
+    # Method that returns the Greeks of every contract of the book as a dictionary of arrays
+    def calculate_option_greeks(self, S0=None, s=None):
+        barrier = self.get_column('barrier_type') >= 0
+        greeks = {}
+        for mask, calculate_greeks, is_barrier in ((~barrier, calculate_option_greeks_BS_batch, False),
+                                                   (barrier, calculate_barrier_option_greeks_BS_batch, True)):
+            if mask.any():
+                for greek, values in calculate_greeks(*self.get_pricer_arguments(mask, is_barrier, S0, s)).items():
+                    greeks.setdefault(greek, zeros(self.size))[mask] = values
+        return greeks
+
+    # Method that calculates the premium required for the book from the stored prices
+    def calculate_premium_strategy(self):
+        premium = -float(self.get_position() @ self.get_column('price'))
+        print('The premium for the strategy stands at: ', round(premium, 2), ' Euros')
+        return premium
+
+    # Payoff at maturity of the whole book for a table of spot prices, computed in blocks of contracts
+    # so that the (contracts x spot prices) matrix never has to be held in memory at once
+    def get_option_payoff(self, spot_price_table, block_size=10000):
+        spot_price_table = asarray(spot_price_table, dtype=float64)
+        payoff = zeros(len(spot_price_table))
+        for start in range(0, self.size, block_size):
+            columns = self.contracts[start:self.size if self.size < start + block_size else start + block_size]
+            K = columns['K'][:, newaxis]
+            intrinsic = maximum(columns['option_type'][:, newaxis] * (spot_price_table - K), 0)
+            barrier_type = columns['barrier_type'][:, newaxis]
+            barrier = columns['barrier'][:, newaxis]
+            # the barrier is judged on the spot price at maturity, as in BarrierOption.get_option_payoff
+            hit = where(barrier_type < 2, spot_price_table <= barrier, spot_price_table >= barrier)
+            active = where(barrier_type < 0, True, where(barrier_type % 2 == 0, hit, ~hit))
+            position = (columns['position_type'] * columns['contract_size'].astype(float64) * columns['multiplier'])[:, newaxis]
+            payoff += (position * where(active, intrinsic, columns['rebate'][:, newaxis])).sum(axis=0)
+        return payoff
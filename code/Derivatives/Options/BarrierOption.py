@@ -1,101 +1,272 @@
 from Derivatives.Options.Option import Option
 from math import *
 from numpy import *
-import scipy.stats as si
+import math
+from Derivatives.Pricing.BlackScholes import calculate_option_price_BS_batch
+from Derivatives.Pricing.BarrierBlackScholes import calculate_barrier_option_price_BS_batch, calculate_barrier_option_greeks_BS_batch
+from Derivatives.Pricing.MonteCarloConfig import MonteCarloConfig
+from Derivatives.Pricing.MonteCarloEngine import MonteCarloEngine
+from Derivatives.Pricing.Heston import HestonMonteCarloEngine
+from Derivatives.Pricing.Fourier import calculate_option_prices_COS
+from Derivatives.Pricing.FiniteDifference import solve_option_PDE
 
 class BarrierOption(Option):
     
-    def __init__(self, S0, K, T, r, s, option_type, position_type, contract_size, multiplier, barrier_type, barrier, q):
+    def __init__(self, S0, K, T, r, s, option_type, position_type, contract_size, multiplier, barrier_type, barrier, q, rebate=0):
         Option.__init__(self, S0, K, T, r, s, option_type, position_type, contract_size, multiplier)
         self.barrier_type = barrier_type
         self.barrier = barrier
         self.q = q
+        self.rebate = rebate
         
-    # Get option price using closed-end formula of Black & Scholes
+    # Get option price using closed-end formula of Black & Scholes (Reiner & Rubinstein) for all
+    # in/out, up/down, call/put cases, the rebate is paid at maturity for knock-in and at the hit for knock-out options
     def calculate_option_price_BS_formula(self):
         
         S0, K, r, T, s, option_type = self.S0, self.K, self.r, self.T, self.s, self.option_type
-        barrier, barrier_type, q = self.barrier, self.barrier_type, self.q
-        
-        # Paramaters d1, d2, lamda and y of the Black & Scholes closed end formula for pricing Barrier options
-        d1 = (log(S0/K) + (r + (s**2/2))*T)/(s*sqrt(T))
-        d2 = d1 - (s*sqrt(T))
-                
-        lamda = (r - q + (s ** 2 /2)) / (s ** 2)                   
-        y = log((barrier ** 2) / (S0 * K))/(s * sqrt(T))     
-         
-        # in addition, parameters x1 and y1 for H >= K
-        x1 = ((log(S0/barrier))/(s*sqrt(T))) + (lamda*s*sqrt(T))
-        y1 = ((log(barrier/S0))/(s*sqrt(T))) + (lamda*s*sqrt(T))
-
-        if option_type == 'call':
-            option_price = S0*si.norm.cdf(d1, 0.0, 1.0) - K*exp(-r * T)*si.norm.cdf(d2, 0.0, 1.0)
-            if barrier_type == 'down-and-in':
-                if barrier < K:
-                    option_price = S0 * exp(-q * T)*((((barrier/S0) ** (2*lamda)) * si.norm.cdf(y, 0.0, 1.0))) - K * exp(-r*T)*( (((barrier/S0) ** (2*lamda - 2)) *  si.norm.cdf(y - (s*sqrt(T)), 0.0, 1.0)))
-                else:
-                    option_price = S0 * exp(-q * T) * (si.norm.cdf(d1, 0.0, 1.0) - si.norm.cdf(x1, 0.0, 1.0) + (((barrier/S0)**(2*lamda))*si.norm.cdf(y1, 0.0, 1.0))) - K * exp(-r*T) * (si.norm.cdf(d2, 0.0, 1.0) - si.norm.cdf(x1 - (s*sqrt(T)), 0.0, 1.0) + (((barrier/S0)**(2*lamda - 2))*si.norm.cdf(y1 - (s*sqrt(T)), 0.0, 1.0)))
-            elif barrier_type == 'down-and-out':
-                if barrier < K:
-                    option_price = S0 * exp(-q * T)*(si.norm.cdf(d1, 0.0, 1.0) - (((barrier/S0) ** (2*lamda)) * si.norm.cdf(y, 0.0, 1.0))) + K * exp(-r*T)*( (((barrier/S0) ** (2*lamda - 2)) *  si.norm.cdf(y - (s*sqrt(T)), 0.0, 1.0)) - si.norm.cdf(d2, 0.0, 1.0))
-                else:
-                    option_price = S0 * exp(-q * T) * (si.norm.cdf(x1, 0.0, 1.0) - (((barrier/S0)**(2*lamda))*si.norm.cdf(y1, 0.0, 1.0))) - K * exp(-r*T) * (si.norm.cdf(x1 - (s*sqrt(T)), 0.0, 1.0) - (((barrier/S0)**(2*lamda - 2))*si.norm.cdf(y1 - (s*sqrt(T)), 0.0, 1.0)))
-            else:
-                pass
-                
-        elif option_type == 'put':
-            pass
-        else:
-            print("Give a proper option type")
+        barrier, barrier_type, q, rebate = self.barrier, self.barrier_type, self.q, self.rebate
+        
+        # single contract run through the vectorized pricer used for batches of barrier options
+        option_price = self.get_cached_result(('BS',), lambda: float(calculate_barrier_option_price_BS_batch(
+            S0, K, T, r, s, option_type, barrier_type, barrier, q, rebate)))
         
         self.price = option_price
         self.payoff = self.get_option_payoff()
         
         return option_price
     
+    # Contract and market data identifying a price, with the barrier parameters
+    def get_pricing_key(self):
+        return super().get_pricing_key() + (self.barrier_type, self.barrier, self.q, self.rebate)
     
+    #Calculate option Greeks by bump-and-reprice of the closed-end formula
+    def calculate_option_greeks(self):
+        
+        S0, K, r, T, s, option_type = self.S0, self.K, self.r, self.T, self.s, self.option_type
+        
+        greeks = self.get_cached_result(('greeks',), lambda: {greek: float(value) for greek, value in
+                                                              calculate_barrier_option_greeks_BS_batch(
+                                                                  S0, K, T, r, s, option_type, self.barrier_type,
+                                                                  self.barrier, self.q, self.rebate).items()})
+        greeks = dict(greeks)
+        
+        for greek, value in greeks.items():
+            setattr(self, greek, value)
+        
+        return greeks
     
-    def get_option_payoff(self):
-        super().get_option_payoff()
+    # Get option price by solving the Black & Scholes PDE with Crank-Nicolson (Rannacher start) on a spot grid that
+    # ends on the barrier, where knock-out options are worth the rebate, knock-in options follow from the in-out parity.
+    # american=True allows early exercise of knock-out options. The delta, gamma and theta come from the same solve,
+    # the surface over the whole grid is kept in self.pde_surface. Options already beyond the barrier use the closed form
+    def calculate_option_price_PDE(self, american=False, spot_steps=800, time_steps=200):
+        
+        S0, K, r, T, s, option_type = self.S0, self.K, self.r, self.T, self.s, self.option_type
         
+        if self.get_barrier_hit(array(S0)):
+            return self.calculate_option_price_BS_formula()
+        
+        surface = self.get_cached_result(('PDE', american, spot_steps, time_steps),
+                                         lambda: solve_option_PDE(S0, K, T, r, s, option_type, self.q, self.barrier_type,
+                                                                  self.barrier, self.rebate, american, spot_steps, time_steps))
+        
+        return self.set_PDE_results(surface)
+    
+    # Get option price using Monte carlo simulation along the paths.
+    # By default the barrier is monitored continuously: the paths are checked at every one of the M steps of
+    # the configuration and, with brownian_bridge_correction, the probability that the path crossed the barrier
+    # between two steps (a Brownian bridge) is taken into account, so coarse grids stay accurate. A list of
+    # monitoring_times (in years) gives discretely monitored barriers, checked on those dates only.
+    # Knocked-out paths are dropped as soon as they hit the barrier. With control_variate the plain vanilla
+    # option with its Black & Scholes price is used as control. The other settings, including the
+    # ParallelMonteCarloExecutor, are those of the plain vanilla Monte Carlo pricer.
+    # A HestonModel as model simulates stochastic volatility instead of the constant volatility s: the bridge
+    # correction then uses the variance of each path over the step, and the control is priced with the COS method
+    def calculate_option_price_MC_BS(self, config=None, monitoring_times=None, brownian_bridge_correction=True,
+                                     antithetic=False, moment_matching=False, control_variate=False, target_std_error=None,
+                                     executor=None, model=None):
+        
+        settings = {'monitoring_times': None if monitoring_times is None else tuple(monitoring_times),
+                    'brownian_bridge_correction': brownian_bridge_correction,
+                    'antithetic': antithetic, 'moment_matching': moment_matching,
+                    'control_variate': control_variate, 'target_std_error': target_std_error, 'model': model}
+        key = self.get_MC_pricing_key('MC', config, settings, executor)
+        if config is None:
+            config = MonteCarloConfig(I=10000, M=50)
+        
+        def calculate():
+            if executor is None:
+                estimate = self.calculate_option_estimate_MC(config, **settings)
+            else:
+                estimate = executor.calculate_estimate(self, config, **settings)
+            return estimate.get_price(), estimate.get_std_error()
+        
+        self.price, self.std_error = self.get_cached_result(key, calculate)
+        self.payoff = self.get_option_payoff()
+        
+        return self.price
+    
+    # Monte Carlo estimate (running mean and standard error) of the option price, see calculate_option_price_MC_BS
+    def calculate_option_estimate_MC(self, config, monitoring_times=None, brownian_bridge_correction=True,
+                                     antithetic=False, moment_matching=False, control_variate=False, target_std_error=None,
+                                     model=None):
+        
+        # Parameters
         S0, K, r, T, s, option_type = self.S0, self.K, self.r, self.T, self.s, self.option_type
-        position_type, contract_size, multiplier = self.position_type, self.contract_size, self.multiplier
-        barrier, barrier_type, q = self.barrier, self.barrier_type, self.q
+        q = self.q
+        
+        # simulation grid: the monitoring dates and maturity, or the M steps of the configuration
+        if monitoring_times is None:
+            times = T * arange(1, config.M + 1) / config.M
+            monitored = ones(len(times), dtype=bool)
+            continuous = brownian_bridge_correction
+        else:
+            monitoring_times = asarray(monitoring_times, dtype=float64)
+            monitoring_times = monitoring_times[(monitoring_times > 0) & (monitoring_times <= T)]
+            times = union1d(monitoring_times, [T])
+            monitored = isin(times, monitoring_times)
+            continuous = False
+        
+        control_function, control_mean = None, None
+        if model is None:
+            engine = MonteCarloEngine(config, 'increments', antithetic, moment_matching, times)
+            payoff_function = self.get_barrier_payoff_function(times, monitored, continuous, early_exit=not control_variate)
+            if control_variate:
+                control_function = self.get_vanilla_control_function(times)
+                control_mean = float(calculate_option_price_BS_batch(S0, K, T, r, s, option_type, q))
+        else:
+            engine = HestonMonteCarloEngine(config, model, 'variance', antithetic, moment_matching, times)
+            payoff_function = self.get_stochastic_volatility_payoff_function(times, monitored, continuous)
+            if control_variate:
+                discount = math.exp(-r * T)
+                control_function = lambda block: discount * self.get_intrinsic_value(exp(block[0, -1].astype(float64)))
+                control_mean = float(calculate_option_prices_COS(S0, K, T, r, option_type, 'heston', q, **model.get_parameters()))
+        
+        return engine.calculate_discounted_payoff(S0, r, s, T, payoff_function, q,
+                                                  control_function, control_mean, target_std_error)
+    
+    # Payoff per simulated path from blocks of Brownian increments on the time grid. Each path carries the
+    # probability that the barrier has not been reached yet; the rebate of knock-out options is paid at the
+    # hit and carried forward to maturity, so that it is discounted from the hitting time by the engine
+    def get_barrier_payoff_function(self, times, monitored, continuous, early_exit=True):
+        S0, K, r, s, q, T = self.S0, self.K, self.r, self.s, self.q, self.T
+        barrier, rebate = self.barrier, self.rebate
+        is_in = self.barrier_type.endswith('-in')
+        is_down = self.barrier_type.startswith('down')
+        if self.barrier_type not in ('down-and-in', 'down-and-out', 'up-and-in', 'up-and-out'):
+            print("Please give a barrier type of down-and-in, down-and-out, up-and-in or up-and-out")
+        
+        dt = diff(times, prepend=0.0)
+        drift = (r - q - 0.5 * s ** 2) * dt
+        log_barrier = math.log(barrier)
+        rebate_growth = rebate * exp(r * (T - times))
+        
+        def payoff_function(dW):
+            n = dW.shape[1]
+            log_S = full(n, math.log(S0))
+            survival = ones(n)
+            rebate_value = zeros(n)
+            alive = arange(n)
+            
+            for k in range(len(times)):
+                previous = log_S[alive]
+                current = previous + drift[k] + s * dW[k, alive]
+                if monitored[k]:
+                    # distance to the barrier, positive on the side where the option has not been hit
+                    distance = (current - log_barrier) if is_down else (log_barrier - current)
+                    hit_probability = (distance <= 0).astype(float64)
+                    if continuous:
+                        previous_distance = (previous - log_barrier) if is_down else (log_barrier - previous)
+                        crossing = exp(-2 * maximum(previous_distance, 0) * maximum(distance, 0) / (s ** 2 * dt[k]))
+                        hit_probability = maximum(hit_probability, crossing)
+                    hit_now = survival[alive] * hit_probability
+                    if not is_in:
+                        rebate_value[alive] += hit_now * rebate_growth[k]
+                    survival[alive] -= hit_now
+                log_S[alive] = current
+                # knocked-out paths carry no more value, stop simulating them
+                if early_exit and not is_in:
+                    alive = alive[survival[alive] > 0]
+            
+            S_T = exp(log_S)
+            intrinsic = self.get_intrinsic_value(S_T)
+            if is_in:
+                return (1 - survival) * intrinsic + survival * rebate
+            return survival * intrinsic + rebate_value
+        
+        return payoff_function
+    
+    # Payoff per simulated path from blocks of log spot price and variance paths of a stochastic volatility model
+    # (2 x steps+1 x n), as get_barrier_payoff_function with all the steps of a block taken at once. The probability
+    # that the path crossed the barrier between two steps is that of a Brownian bridge with the variance of the step
+    def get_stochastic_volatility_payoff_function(self, times, monitored, continuous):
+        K, r, T = self.K, self.r, self.T
+        barrier, rebate = self.barrier, self.rebate
+        is_in = self.barrier_type.endswith('-in')
+        is_down = self.barrier_type.startswith('down')
+        if self.barrier_type not in ('down-and-in', 'down-and-out', 'up-and-in', 'up-and-out'):
+            print("Please give a barrier type of down-and-in, down-and-out, up-and-in or up-and-out")
+        
+        dt = diff(times, prepend=0.0)[:, newaxis]
+        log_barrier = math.log(barrier)
+        rebate_growth = rebate * exp(r * (T - times))
+        
+        def payoff_function(block):
+            log_S, V = block[0].astype(float64), block[1].astype(float64)
+            # distance to the barrier, positive on the side where the option has not been hit
+            distance = (log_S - log_barrier) if is_down else (log_barrier - log_S)
+            hit_probability = (distance[1:] <= 0).astype(float64)
+            if continuous:
+                # the trapezoidal variance of the step, floored where the variance touched zero on both ends
+                variance = maximum(0.5 * (V[:-1] + V[1:]) * dt, 1e-12)
+                crossing = exp(-2 * maximum(distance[:-1], 0) * maximum(distance[1:], 0) / variance)
+                hit_probability = maximum(hit_probability, crossing)
+            hit_probability[~monitored] = 0
+            survival = cumprod(1 - hit_probability, axis=0)
             
-        ceiling = math.ceil(2 * S0) # assuming that the underlying is the same for all the options, we put a limit of the spot price as 2x the current price
-        spot_price_table = linspace(0, ceiling, ceiling*10, endpoint=False)  #create the table of spot prices so as to compute the payoff
-        payoff = [0]*len(spot_price_table)
-        for i in range(0,len(spot_price_table),1):
-            if position_type == 'Long':
-                if barrier_type == 'down-and-in':
-                    if barrier <= spot_price_table[i]:
-                        payoff[i] = (maximum(spot_price_table[i]-K, 0) * contract_size * multiplier) + payoff[i]
-                    else:
-                        payoff[i] = 0
-                elif barrier_type == 'down-and-out':
-                    if barrier <= spot_price_table[i]:
-                        payoff[i] = 0
-                    else:
-                        payoff[i] = (maximum(spot_price_table[i]-K, 0) * contract_size * multiplier) + payoff[i]
-                else:
-                    pass
-            elif position_type == 'Short':
-                if barrier_type == 'down-and-in':
-                    if barrier <= spot_price_table[i]:
-                        payoff[i] = payoff[i] = (-maximum(spot_price_table[i]-K,0) * contract_size * multiplier) + payoff[i]
-                    else:
-                        payoff[i] = 0
-                elif barrier_type == 'down-and-out':
-                    if barrier <= spot_price_table[i]:
-                        payoff[i] = 0
-                    else:
-                        payoff[i] = (-maximum(spot_price_table[i]-K,0) * contract_size * multiplier) + payoff[i]
-                else:
-                    pass
-            else: 
-                print("Please give either Long or Short for the position type")
-            payoff[i] = round(payoff[i],2)
-        
-        return payoff
+            intrinsic = self.get_intrinsic_value(exp(log_S[-1]))
+            if is_in:
+                return (1 - survival[-1]) * intrinsic + survival[-1] * rebate
+            # the rebate of the paths knocked out at each step, carried forward to maturity
+            hit_now = concatenate((1 - survival[:1], survival[:-1] - survival[1:]))
+            return survival[-1] * intrinsic + rebate_growth @ hit_now
+        
+        return payoff_function
+    
+    # Discounted payoff of the plain vanilla option with the same strike, used as control variate
+    def get_vanilla_control_function(self, times):
+        S0, r, s, q, T = self.S0, self.r, self.s, self.q, self.T
+        drift = (r - q - 0.5 * s ** 2) * times[-1]
+        discount = math.exp(-r * T)
+        
+        def control_function(dW):
+            S_T = S0 * exp(drift + s * dW.sum(axis=0))
+            return discount * self.get_intrinsic_value(S_T)
+        
+        return control_function
+    
+    # Whether the barrier is reached at each spot price of the table, judged on the spot price at maturity
+    def get_barrier_hit(self, spot_price_table):
+        if self.barrier_type in ('down-and-in', 'down-and-out'):
+            return spot_price_table <= self.barrier
+        elif self.barrier_type in ('up-and-in', 'up-and-out'):
+            return spot_price_table >= self.barrier
+        else:
+            print("Please give a barrier type of down-and-in, down-and-out, up-and-in or up-and-out")
+            return zeros(spot_price_table.shape, dtype=bool)
     
-    
\ No newline at end of file
+    # Payoff at maturity for the table of spot prices, by default the option's own table from 0 to 2x the spot price
+    def get_option_payoff(self, spot_price_table=None):
+        super().get_option_payoff()
+        
+        contract_size, multiplier, barrier_type = self.contract_size, self.multiplier, self.barrier_type
+        
+        if spot_price_table is None:
+            spot_price_table = self.get_spot_price_table()  #create the table of spot prices so as to compute the payoff
+        hit = self.get_barrier_hit(spot_price_table)
+        
+        # knock-in options pay where the barrier is reached, knock-out options where it is not, the rebate elsewhere
+        active = hit if barrier_type.endswith('-in') else ~hit
+        payoff = self.get_position_sign() * where(active, self.get_intrinsic_value(spot_price_table), self.rebate) * contract_size * multiplier
+        
+        return around(payoff, 2) + 0.0  # + 0.0 turns -0.0 of the short positions into 0.0
@@ -1,5 +1,8 @@
 
+import math
+from numpy import *
 from Derivatives.Derivative import Derivative
+from Derivatives.Pricing.FiniteDifference import interpolate_PDE_surface
 
 class Option(Derivative):
     
@@ -8,9 +11,55 @@ class Option(Derivative):
         self.s = s
         self.option_type = option_type
         self.price = 0
+        self.std_error = 0
         self.delta = 0
         self.gamma = 0
         self.vega = 0
+        self.theta = 0
+        self.rho = 0
+        self.vanna = 0
+        self.volga = 0
+        self.charm = 0
+        self.pricing_cache = None
+        self.pde_surface = None
+    
+    # Method that lets the pricing methods keep their results in a PricingCache (None switches the cache off)
+    def set_pricing_cache(self, pricing_cache):
+        self.pricing_cache = pricing_cache
+    
+    # Method that keeps the price and Greeks of a finite-difference solve at the option's spot price,
+    # with the surface of prices, deltas, gammas and thetas over the whole spot grid in self.pde_surface
+    def set_PDE_results(self, surface):
+        self.pde_surface = surface
+        values = interpolate_PDE_surface(surface, self.S0)
+        self.price = values['price']
+        self.delta, self.gamma, self.theta = values['delta'], values['gamma'], values['theta']
+        self.payoff = self.get_option_payoff()
+        return self.price
+    
+    # The pricing cache stays in this process when the option is sent to worker processes
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['pricing_cache'] = None
+        return state
+    
+    # Contract and market data identifying a price, extended by the option classes with their own parameters
+    def get_pricing_key(self):
+        return (type(self).__name__, self.S0, self.K, self.T, self.r, self.s, self.option_type)
+    
+    # Result of calculate() for the pricing method and settings in key, taken from the pricing cache when there is one
+    def get_cached_result(self, key, calculate):
+        if self.pricing_cache is None or key is None:
+            return calculate()
+        return self.pricing_cache.get_or_calculate(self.get_pricing_key() + key, calculate)
+    
+    # Key of a Monte Carlo run: the settings of the pricer and the configuration, None when the configuration
+    # draws fresh random numbers on every call (no seed given) and the run should not be replayed from the cache
+    def get_MC_pricing_key(self, method, config, settings, executor=None):
+        if config is None:
+            return None
+        workers = None if executor is None else executor.n_workers
+        return (method, tuple(sorted(settings.items())), config.get_key(), workers)
     
     def get_option_properties(self):
         option_1 = self
@@ -19,6 +68,21 @@ class Option(Derivative):
         for i in vars(option_1):
             print(i, ':', vars(option_1)[i])
             
+    # Table of spot prices on which the payoff is computed
+    def get_spot_price_table(self):
+        ceiling = math.ceil(2 * self.S0) # assuming that the underlying is the same for all the options, we put a limit of the spot price as 2x the current price
+        return linspace(0, ceiling, ceiling*10, endpoint=False)
+    
+    # Value at maturity of one option for an array of spot prices
+    def get_intrinsic_value(self, spot_price_table):
+        if self.option_type == 'call':
+            return maximum(spot_price_table - self.K, 0)
+        elif self.option_type == 'put':
+            return maximum(self.K - spot_price_table, 0)
+        else:
+            print("Give a proper option type")
+            return zeros_like(spot_price_table)
+    
     def get_option_payoff(self):
         pass
          
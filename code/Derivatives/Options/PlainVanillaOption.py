@@ -1,8 +1,18 @@
+import math
 from math import *
 from numpy import *
-import scipy.stats as si
-from matplotlib import pyplot
 from Derivatives.Options.Option import Option
+from Derivatives.Pricing.BlackScholes import calculate_option_price_BS_batch, calculate_option_greeks_BS_batch
+from Derivatives.Pricing.MonteCarloConfig import MonteCarloConfig
+from Derivatives.Pricing.MonteCarloEngine import MonteCarloEngine
+from Derivatives.Pricing.Heston import HestonMonteCarloEngine
+from Derivatives.Pricing.ValueAtRisk import get_risk_table
+from Derivatives.Pricing.Lattice import calculate_option_price_lattice
+from Derivatives.Pricing.FiniteDifference import solve_option_PDE
+from Derivatives.Pricing.Fourier import calculate_option_prices_Fourier
+from Derivatives.Pricing.LeastSquaresMonteCarlo import calculate_option_estimate_LSM
+from Derivatives.Pricing.ImpliedVolatility import calculate_implied_volatility_batch
+from Derivatives import Reporting
 
 class PlainVanillaOption(Option):
     
@@ -14,15 +24,8 @@ class PlainVanillaOption(Option):
         
         S0, K, r, T, s, option_type = self.S0, self.K, self.r, self.T, self.s, self.option_type
         
-        d1 = (log(S0/K) + (r + (s**2/2))*T)/(s*math.sqrt(T))
-        d2 = d1 - (s*math.sqrt(T))
-        
-        if option_type == 'call':
-            option_price = S0*si.norm.cdf(d1, 0.0, 1.0) - K*exp(-r * T)*si.norm.cdf(d2, 0.0, 1.0)
-        elif option_type == 'put':
-            option_price = K*exp(-r * T)*si.norm.cdf(-d2, 0.0, 1.0) - S0*si.norm.cdf(-d1, 0.0, 1.0)
-        else:
-            print("Give a proper option type")
+        # single contract run through the vectorized pricer used for whole chains
+        option_price = self.get_cached_result(('BS',), lambda: float(calculate_option_price_BS_batch(S0, K, T, r, s, option_type)))
         
         self.price = option_price
         self.payoff = self.get_option_payoff()
@@ -30,157 +33,239 @@ class PlainVanillaOption(Option):
         return option_price
     
     
+    # Get option price on a binomial (crr, leisen_reimer) or trinomial lattice with N steps, for American
+    # (early exercise at every step) or European exercise. The price is extrapolated from the trees with N and N/2
+    # steps with richardson (by default only on the leisen_reimer tree), and the delta, gamma and theta of the option
+    # are taken from the same tree
+    def calculate_option_price_lattice(self, N=200, method='leisen_reimer', american=True, richardson=None):
+        
+        S0, K, r, T, s, option_type = self.S0, self.K, self.r, self.T, self.s, self.option_type
+        
+        result = self.get_cached_result(('lattice', N, method, american, richardson),
+                                        lambda: calculate_option_price_lattice(S0, K, T, r, s, option_type, 0.0, N,
+                                                                               method, american, richardson))
+        
+        self.price = result['price']
+        self.delta, self.gamma, self.theta = result['delta'], result['gamma'], result['theta']
+        self.payoff = self.get_option_payoff()
+        
+        return self.price
+    
+    # Get option price by solving the Black & Scholes PDE with Crank-Nicolson (Rannacher start) on a spot grid of
+    # spot_steps intervals dense around the strike and time_steps steps, for American or European exercise.
+    # The delta, gamma and theta come from the same solve, the surface over the whole grid is kept in self.pde_surface
+    def calculate_option_price_PDE(self, american=False, spot_steps=800, time_steps=200):
+        
+        S0, K, r, T, s, option_type = self.S0, self.K, self.r, self.T, self.s, self.option_type
+        
+        surface = self.get_cached_result(('PDE', american, spot_steps, time_steps),
+                                         lambda: solve_option_PDE(S0, K, T, r, s, option_type, american=american,
+                                                                  spot_steps=spot_steps, time_steps=time_steps))
+        
+        return self.set_PDE_results(surface)
+    
+    # Get option price from the characteristic function of a model with the fft (Carr-Madan) or cos (Fang-Oosterlee) method.
+    # model is black_scholes, heston or merton, the volatility s of the option is used unless given in the parameters
+    # (for heston: v0, kappa, theta, sigma, rho, for merton: jump_intensity, jump_mean, jump_std)
+    def calculate_option_price_Fourier(self, method='cos', model='black_scholes', **parameters):
+        
+        S0, K, r, T, option_type = self.S0, self.K, self.r, self.T, self.option_type
+        if model != 'heston':
+            parameters.setdefault('s', self.s)
+        
+        self.price = self.get_cached_result(('Fourier', method, model, tuple(sorted(parameters.items()))),
+                                            lambda: float(calculate_option_prices_Fourier(S0, K, T, r, option_type, model, 0.0,
+                                                                                          method, **parameters)))
+        self.payoff = self.get_option_payoff()
+        
+        return self.price
+    
+    # Get the American or Bermudan option price with Longstaff-Schwartz least-squares Monte Carlo.
+    # The exercise dates are exercise_times (in years) or, for American exercise, the M steps of the configuration.
+    # The continuation values are regressed on a polynomial or laguerre basis of the given degree over pilot_paths
+    # paths, the price is then estimated on the I paths of the configuration, in blocks of config.chunk_size
+    def calculate_option_price_LSM(self, config=None, exercise_times=None, basis='laguerre', degree=3, pilot_paths=None,
+                                   antithetic=False, moment_matching=False, target_std_error=None):
+        
+        S0, K, r, T, s, option_type = self.S0, self.K, self.r, self.T, self.s, self.option_type
+        
+        settings = {'exercise_times': None if exercise_times is None else tuple(exercise_times), 'basis': basis,
+                    'degree': degree, 'pilot_paths': pilot_paths, 'antithetic': antithetic,
+                    'moment_matching': moment_matching, 'target_std_error': target_std_error}
+        key = self.get_MC_pricing_key('LSM', config, settings)
+        
+        def calculate():
+            estimate = calculate_option_estimate_LSM(S0, K, T, r, s, option_type, config, **settings)
+            return estimate.get_price(), estimate.get_std_error()
+        
+        self.price, self.std_error = self.get_cached_result(key, calculate)
+        self.payoff = self.get_option_payoff()
+        
+        return self.price
+    
+    # Get the volatility s implied by a market price of the option, the option keeps it as its volatility
+    def calculate_implied_volatility(self, market_price):
+        
+        S0, K, r, T, option_type = self.S0, self.K, self.r, self.T, self.option_type
+        
+        volatility, converged = calculate_implied_volatility_batch(market_price, S0, K, T, r, option_type)
+        if not converged:
+            print("No implied volatility found for the market price: ", market_price)
+            return nan
+        
+        self.s = float(volatility)
+        
+        return self.s
+    
     # Get option price using Monte carlo simulation
-    def calculate_option_price_MC_BS(self):
+    # mode 'terminal' simulates only the end-of-period spot prices, mode 'path' full paths with M time steps,
+    # in both cases the paths are generated in blocks of config.chunk_size so memory does not grow with I.
+    # The number of paths I, steps M and the seeded random stream come from the MonteCarloConfig.
+    # Variance reduction is selected per call: antithetic variates, moment matching of the normals and a
+    # control variate on the discounted underlying, whose price S0 is known exactly. With target_std_error
+    # the simulation stops once the standard error (kept in self.std_error) reaches the target.
+    # With a ParallelMonteCarloExecutor the paths are spread over its worker processes.
+    # A HestonModel as model simulates stochastic volatility instead of the constant volatility s.
+    # Graphs of a sample of the simulated paths are only drawn with plot=True
+    def calculate_option_price_MC_BS(self, config=None, mode='terminal', antithetic=False, moment_matching=False,
+                                     control_variate=False, target_std_error=None, plot=False, executor=None, model=None):
         
         # Parameters
         S0, K, r, T, s, option_type = self.S0, self.K, self.r, self.T, self.s, self.option_type
+        settings = {'mode': mode, 'antithetic': antithetic, 'moment_matching': moment_matching,
+                    'control_variate': control_variate, 'target_std_error': target_std_error, 'model': model}
+        key = self.get_MC_pricing_key('MC', config, settings, executor)
        
-        M = 50; dt = T / M; I = 10000
-        # Simulating I paths with M time steps
-        
-        S = S0 * exp(cumsum((r - 0.5 * s ** 2) * dt
-+ s * math.sqrt(dt)
-* random.standard_normal((M + 1, I)), axis=0))
-        
-        # sum instead of cumsum would also do
-        # if only the final values are of interest
-        S[0] = S0
-        # Calculating the Monte Carlo estimator
-        
-        if option_type == 'call':
-            option_price_MC = math.exp(-r * T) * sum(maximum(S[-1] - K, 0)) / I
-        elif option_type == 'put':
-            option_price_MC = math.exp(-r * T) * sum(maximum(K - S[-1], 0)) / I
-        else:
-            print("Give a proper option type")
+        if config is None:
+            config = MonteCarloConfig(I=10000, M=50)
+        
+        def calculate():
+            if executor is None:
+                estimate = self.calculate_option_estimate_MC(config, **settings)
+            else:
+                estimate = executor.calculate_estimate(self, config, **settings)
+            return estimate.get_price(), estimate.get_std_error()
+        
+        option_price_MC, std_error = self.get_cached_result(key, calculate)
             
         #print('The European', option_type, 'option Value is: ', option_price_MC)
         
-        self.get_graphical_visualization(S) # Uncomment for some plotting
+        # a separate sample of paths for the graphs, the pricing itself never keeps them
+        if plot:
+            sample_engine = self.get_MC_engine(config.replace(sampler='pseudo'), 'path', model=model)
+            sample_paths = sample_engine.generate_paths(S0, r, s, T, config.I if config.I < config.chunk_size else config.chunk_size)
+            self.get_graphical_visualization(sample_paths)
         
         self.price = option_price_MC
+        self.std_error = std_error
         self.payoff = self.get_option_payoff()
         
-    #Calculate option Greeks
-    def calculate_option_greeks(self):
+        return self.price
+    
+    # Monte Carlo estimate (running mean and standard error) of the option price, see calculate_option_price_MC_BS
+    def calculate_option_estimate_MC(self, config, mode='terminal', antithetic=False, moment_matching=False,
+                                     control_variate=False, target_std_error=None, model=None):
         
         S0, K, r, T, s, option_type = self.S0, self.K, self.r, self.T, self.s, self.option_type
         
-        d1 = (log(S0/K) + (r + (s**2/2))*T)/(s*math.sqrt(T))
+        engine = self.get_MC_engine(config, mode, antithetic, moment_matching, model=model)
         
-        if option_type == 'call':
-            delta = si.norm.cdf(d1, 0.0, 1.0) #Delta of the call option
-        elif option_type == 'put':
-            delta = -si.norm.cdf(-d1, 0.0, 1.0) #Delta of the put option
-        else:
+        if option_type not in ('call', 'put'):
             print("Give a proper option type")
-            
         
-        gamma = si.norm.pdf(d1,0.0, 1.0)/(S0*s*math.sqrt(T))  #Gamma of the call or put option
-        vega = si.norm.pdf(d1,0.0, 1.0)*S0*math.sqrt(T)
+        control_function = None
+        if control_variate:
+            discount = math.exp(-r * T)
+            control_function = lambda block: discount * (block if mode == 'terminal' else block[-1])
+        
+        # Calculating the Monte Carlo estimator from the running payoff sums
+        return engine.calculate_discounted_payoff(S0, r, s, T, self.get_terminal_payoff_function(mode),
+                                                  control_function=control_function, control_mean=S0,
+                                                  target_std_error=target_std_error)
+        
+    # Monte Carlo engine of the dynamics of the underlying: GBM with the volatility s, or the stochastic volatility model
+    def get_MC_engine(self, config, mode='terminal', antithetic=False, moment_matching=False, times=None, model=None):
+        if model is None:
+            return MonteCarloEngine(config, mode, antithetic, moment_matching, times)
+        return HestonMonteCarloEngine(config, model, mode, antithetic, moment_matching, times)
+    
+    # Payoff at maturity per simulated path, for blocks of terminal values or of full paths
+    def get_terminal_payoff_function(self, mode='terminal'):
+        K, option_type = self.K, self.option_type
         
-        self.delta = delta
-        self.gamma = gamma
-        self.vega = vega
+        def payoff_function(block):
+            S_T = block if mode == 'terminal' else block[-1]
+            if option_type == 'call':
+                return maximum(S_T - K, 0)
+            return maximum(K - S_T, 0)
         
-        greeks = {'delta':delta, 'gamma':gamma, 'vega': vega }
+        return payoff_function
         
-        #return greeks
-    
-    def get_graphical_visualization(self, S):
+    #Calculate option Greeks
+    def calculate_option_greeks(self):
         
-        strike_price = self.K
-        
-        # Graphical visualization of simulated paths
-        pyplot.title('Monte Carlo simulation scenarios')
-        pyplot.plot(S[:, :100])
-        pyplot.grid(True)
-        pyplot.xlabel('Steps')
-        pyplot.ylabel('Underlying Price level')
-        pyplot.show()
-        
-        # Histogram of Underlying market value at time T
-        pyplot.title('Histogram: simulated end-of-period spot prices')
-        #pyplot.rcParams["figure.figsize"] = (10,3)
-        pyplot.hist(S[-1], bins=50)
-        pyplot.grid(True)
-        pyplot.xlabel('Underlying Price level')
-        pyplot.ylabel('frequency')
-        pyplot.show()
-        
-        # Payoff of the Option at time T
-        pyplot.title('Histogram: simulated option values')
-        #pyplot.rcParams["figure.figsize"] = (10,3)
-        if self.option_type == 'call':
-            pyplot.hist(maximum(S[-1] - self.K, 0), bins=50)
-        elif self.option_type == 'put':
-            pyplot.hist(maximum(self.K - S[-1], 0), bins=50)
-        else:
-            print("Give a proper option type")
-            
-        pyplot.grid(True)
-        pyplot.xlabel('option value')
-        pyplot.ylabel('frequency')
-        pyplot.ylim(0, 7000)
-        pyplot.show()
+        S0, K, r, T, s, option_type = self.S0, self.K, self.r, self.T, self.s, self.option_type
+        
+        greeks = self.get_cached_result(('greeks',), lambda: {greek: float(value) for greek, value in
+                                                              calculate_option_greeks_BS_batch(S0, K, T, r, s, option_type).items()})
+        greeks = dict(greeks)
         
+        for greek, value in greeks.items():
+            setattr(self, greek, value)
+        
+        return greeks
+    
+    def get_graphical_visualization(self, S):
+        Reporting.plot_simulated_paths(S, self.K, self.option_type)
        
     def get_option_properties(self):
          super().get_option_properties()
     
-    def get_option_payoff(self):
+    # Payoff at maturity for the table of spot prices, by default the option's own table from 0 to 2x the spot price
+    def get_option_payoff(self, spot_price_table=None):
         super().get_option_payoff()
         
-        S0, K, r, T, s, option_type = self.S0, self.K, self.r, self.T, self.s, self.option_type
-            
-        position_type, contract_size, multiplier = self.position_type, self.contract_size, self.multiplier
-            
-        ceiling = math.ceil(2 * S0) # assuming that the underlying is the same for all the options, we put a limit of the spot price as 2x the current price
-        spot_price_table = linspace(0, ceiling, ceiling*10, endpoint=False)  #create the table of spot prices so as to compute the payoff
-        payoff = [0]*len(spot_price_table)
-        for i in range(0,len(spot_price_table),1):
-            if position_type == 'Long':
-                payoff[i] = (maximum(spot_price_table[i]-K, 0) * contract_size * multiplier) + payoff[i]
-            elif position_type == 'Short':
-                payoff[i] = (-maximum(spot_price_table[i]-K,0) * contract_size * multiplier) + payoff[i]
-            else: 
-                print("Please give either Long or Short for the position type")
-            payoff[i] = round(payoff[i],2)
-        
-        return payoff
+        contract_size, multiplier = self.contract_size, self.multiplier
+        
+        if spot_price_table is None:
+            spot_price_table = self.get_spot_price_table()  #create the table of spot prices so as to compute the payoff
+        payoff = self.get_position_sign() * self.get_intrinsic_value(spot_price_table) * contract_size * multiplier
+        
+        return around(payoff, 2) + 0.0  # + 0.0 turns -0.0 of the short positions into 0.0
     
-    # compute the option's VAR and Expected Shortfall using Monte Carlo 
-    def get_option_VAR(self):
+    # compute the option's VAR and Expected Shortfall using Monte Carlo.
+    # The spot price is simulated up to the horizon in years (10 trading days by default, as the portfolio VaR) and
+    # the option is revalued there with its remaining maturity, the profit and loss of the position (signed and scaled
+    # by contract_size * multiplier as in the portfolio) is measured against today's Black & Scholes price.
+    # Returns a structured array with the VaR and ES per confidence level.
+    # With a HestonModel as model the spot price and its variance are simulated together and the option is revalued
+    # with its volatility s scaled by the move of the volatility of the model, sqrt(v/v0)
+    def get_option_VAR(self, config=None, confidence_levels=0.95, horizon=10/252, model=None):
         
         # Parameters
         S0, K, r, T, s, option_type = self.S0, self.K, self.r, self.T, self.s, self.option_type
+        notional = self.get_position_sign() * self.contract_size * self.multiplier
        
-        M = 1; dt = T / M; I = 10000
-        # Simulating I paths with M time steps
-        
-        S = S0 * exp(cumsum((r - 0.5 * s ** 2) * dt
-+ s * math.sqrt(dt)
-* random.standard_normal((M + 1, I)), axis=0))
-        
-        # sum instead of cumsum would also do
-        # if only the final values are of interest
-        S[0] = S0
-       
-        # Calculating the Monte Carlo estimator
-        
-        d1 = (log(S0/K) + (r + (s**2/2))*T)/(s*math.sqrt(T))
-        d2 = d1 - (s*math.sqrt(T))
-        
-        if option_type == 'call':
-            option_price = S[-1]*si.norm.cdf(d1, 0.0, 1.0) - K*exp(-r * T)*si.norm.cdf(d2, 0.0, 1.0)
-        elif option_type == 'put':
-            option_price = K*exp(-r * T)*si.norm.cdf(-d2, 0.0, 1.0) - S[-1]*si.norm.cdf(-d1, 0.0, 1.0)
+        if config is None:
+            config = MonteCarloConfig(I=10000, M=1)
+        # Simulating only the spot prices at the horizon, the (M+1) x I path matrix is not needed
+        if model is None:
+            S_h = MonteCarloEngine(config).generate_terminal_values(S0, r, s, horizon, config.I)
+            s_h = s
         else:
-            print("Give a proper option type")
+            log_S, V = HestonMonteCarloEngine(config, model).generate_heston_paths(S0, r, horizon, config.I, keep_paths=False)
+            S_h = exp(log_S[0].astype(float64))
+            s_h = s * sqrt(maximum(V[0].astype(float64) / model.v0, 1e-8))
+       
+        # Revaluing the option on every scenario, at maturity the formula returns the payoff
+        remaining = T - horizon if T - horizon > 1e-12 else 1e-12
+        option_price = calculate_option_price_BS_batch(S_h, K, remaining, r, s_h, option_type)
         
-        pnl = sort(self.price-option_price)
-        var = pnl[-500]
+        pnl = notional * (option_price - float(calculate_option_price_BS_batch(S0, K, T, r, s, option_type)))
+        table = get_risk_table(pnl[newaxis, :], horizon, confidence_levels)
             
-        print('The European', option_type, 'option price is: ', self.price , 'VAR at 95% C.I. is: ', var )
-                
+        for row in table:
+            print('The European', option_type, 'option price is: ', self.price, 'VAR at', round(100 * row['confidence_level'], 2),
+                  '% C.I. is: ', row['VaR'], 'and Expected Shortfall is: ', row['ES'])
+        
+        return table
@@ -1,16 +1,285 @@
 from numpy import *
 import math
-from matplotlib import pyplot
+from Derivatives.Options.PlainVanillaOption import PlainVanillaOption
+from Derivatives.Options.BarrierOption import BarrierOption
+from Derivatives.Pricing.BlackScholes import calculate_option_price_BS_batch, calculate_option_greeks_BS_batch
+from Derivatives.Pricing.BarrierBlackScholes import calculate_barrier_option_price_BS_batch, calculate_barrier_option_greeks_BS_batch
+from Derivatives.Pricing.MonteCarloConfig import MonteCarloConfig
+from Derivatives.Pricing.MonteCarloEngine import MonteCarloEngine
+from Derivatives.Pricing.Heston import HestonMonteCarloEngine
+from Derivatives.Pricing.ValueAtRisk import get_risk_table, print_risk_table
+from Derivatives.Pricing.HistoricalSimulation import get_age_weights, get_filtered_returns, get_horizon_returns
+from Derivatives.MarketData import MarketData
+from Derivatives import Reporting
+
+GREEKS = ('delta', 'gamma', 'vega', 'theta', 'rho', 'vanna', 'volga', 'charm')
+
+# Largest number of (leg, scenario) prices evaluated at once by the scenario revaluation
+REVALUATION_BLOCK = 4000000
 
 class Portfolio:
     
-    def __init__(self, name):
+    # spot_range = (lower, upper) and resolution (points per unit of the spot price) set the spot grid of the
+    # payoff diagram, by default it runs from 0 to 2x the spot price of the first product with 10 points per unit
+    def __init__(self, name, spot_range=None, resolution=10):
         self.name = name
         self.product_list = []
         self.premium = 0
+        self.spot_range = spot_range
+        self.resolution = resolution
 
     def add_product(self, product):
         self.product_list.append(product)
+    
+    # Method that gives all the products of the portfolio the same PricingCache (None switches the caches off)
+    def set_pricing_cache(self, pricing_cache):
+        for product in self.product_list:
+            if hasattr(product, 'set_pricing_cache'):
+                product.set_pricing_cache(pricing_cache)
+    
+    # Method that changes the spot grid shared by all the products of the portfolio
+    def set_spot_grid(self, lower, upper, resolution=10):
+        self.spot_range = (lower, upper)
+        self.resolution = resolution
+    
+    # Table of spot prices on which the payoff of every product is computed
+    def get_spot_price_table(self):
+        if self.spot_range is None:
+            lower, upper = 0, math.ceil(2 * self.product_list[0].S0) # assuming that the underlying is the same for all the options, we put a limit of the spot price as 2x the current price
+        else:
+            lower, upper = self.spot_range
+        points = int(math.ceil((upper - lower) * self.resolution))
+        return linspace(lower, upper, points, endpoint=False)
+        
+    # Method that prices the options of the portfolio with vectorized closed-end formulas,
+    # one pass for all the plain vanilla options and one for all the barrier options
+    def calculate_option_prices_BS(self):
+        options = [product for product in self.product_list if isinstance(product, PlainVanillaOption)]
+        if options:
+            prices = calculate_option_price_BS_batch([option.S0 for option in options],
+                                                     [option.K for option in options],
+                                                     [option.T for option in options],
+                                                     [option.r for option in options],
+                                                     [option.s for option in options],
+                                                     [option.option_type for option in options])
+            for option, price in zip(options, prices):
+                option.price = float(price)
+                option.payoff = option.get_option_payoff()
+        
+        options = [product for product in self.product_list if isinstance(product, BarrierOption)]
+        if options:
+            prices = calculate_barrier_option_price_BS_batch([option.S0 for option in options],
+                                                             [option.K for option in options],
+                                                             [option.T for option in options],
+                                                             [option.r for option in options],
+                                                             [option.s for option in options],
+                                                             [option.option_type for option in options],
+                                                             [option.barrier_type for option in options],
+                                                             [option.barrier for option in options],
+                                                             [option.q for option in options],
+                                                             [option.rebate for option in options])
+            for option, price in zip(options, prices):
+                option.price = float(price)
+                option.payoff = option.get_option_payoff()
+        
+        # the rest of the products keep their own closed-end formula
+        for product in self.product_list:
+            if not isinstance(product, (PlainVanillaOption, BarrierOption)):
+                product.calculate_option_price_BS_formula()
+        
+    # Method that revalues every leg of the portfolio with prices and Greeks in one pass per product type:
+    # the plain vanilla and the barrier legs each go through their vectorized pricer, other products use their own methods.
+    # S0 and s replace the spot price and the volatility of all the legs (e.g. on a market tick), by default the
+    # legs keep their own. Returns the per-leg values (per option and the signed number of options held) and
+    # the aggregate price and Greeks of the portfolio, the per-option prices and Greeks are also stored on the products
+    def calculate_portfolio_valuation(self, S0=None, s=None):
+        n = len(self.product_list)
+        legs = {'price': zeros(n)}
+        for greek in GREEKS:
+            legs[greek] = zeros(n)
+        legs['position'] = array([product.get_position_sign() * product.contract_size * product.multiplier
+                                  for product in self.product_list], dtype=float64)
+        
+        def get_market_data(options):
+            spot = array([option.S0 for option in options], dtype=float64) if S0 is None else full(len(options), S0, dtype=float64)
+            volatility = array([option.s for option in options], dtype=float64) if s is None else full(len(options), s, dtype=float64)
+            return spot, volatility
+        
+        vanilla = [i for i, product in enumerate(self.product_list) if isinstance(product, PlainVanillaOption)]
+        if vanilla:
+            options = [self.product_list[i] for i in vanilla]
+            spot, volatility = get_market_data(options)
+            arguments = (spot, [option.K for option in options], [option.T for option in options],
+                         [option.r for option in options], volatility, [option.option_type for option in options])
+            legs['price'][vanilla] = calculate_option_price_BS_batch(*arguments)
+            for greek, values in calculate_option_greeks_BS_batch(*arguments).items():
+                legs[greek][vanilla] = values
+        
+        barrier = [i for i, product in enumerate(self.product_list) if isinstance(product, BarrierOption)]
+        if barrier:
+            options = [self.product_list[i] for i in barrier]
+            spot, volatility = get_market_data(options)
+            arguments = (spot, [option.K for option in options], [option.T for option in options],
+                         [option.r for option in options], volatility, [option.option_type for option in options],
+                         [option.barrier_type for option in options], [option.barrier for option in options],
+                         [option.q for option in options], [option.rebate for option in options])
+            legs['price'][barrier] = calculate_barrier_option_price_BS_batch(*arguments)
+            for greek, values in calculate_barrier_option_greeks_BS_batch(*arguments).items():
+                legs[greek][barrier] = values
+        
+        # the rest of the products keep their own closed-end formula, and Greeks where they have them
+        for i, product in enumerate(self.product_list):
+            if not isinstance(product, (PlainVanillaOption, BarrierOption)):
+                legs['price'][i] = product.calculate_option_price_BS_formula()
+                if hasattr(product, 'calculate_option_greeks'):
+                    for greek, value in product.calculate_option_greeks().items():
+                        legs[greek][i] = value
+        
+        for i, product in enumerate(self.product_list):
+            product.price = float(legs['price'][i])
+            for greek in GREEKS:
+                setattr(product, greek, float(legs[greek][i]))
+        
+        # the value of the portfolio is what the legs are worth, the opposite of the premium paid for them
+        total = {key: float(legs['position'] @ legs[key]) for key in ('price',) + GREEKS}
+        
+        return legs, total
+    
+    # Method that revalues the whole portfolio on scenarios of the underlying after a time horizon (in years).
+    # relative_spot holds the spot price of each scenario relative to today's, every leg is repriced with its own
+    # spot price moved by the same factor and its remaining maturity T - horizon (legs that expire before the horizon
+    # are worth their payoff). The barrier legs are judged on the spot price at the horizon only.
+    # relative_volatility optionally moves the volatility of every leg by a factor per scenario in the same way.
+    # Returns the value of the portfolio (signed by the positions) per scenario
+    def calculate_scenario_values(self, relative_spot, horizon=0.0, relative_volatility=None):
+        relative_spot = asarray(relative_spot, dtype=float64)
+        values = zeros(len(relative_spot))
+        block = REVALUATION_BLOCK // len(self.product_list) if len(self.product_list) < REVALUATION_BLOCK else 1
+        
+        groups = []
+        for option_class, price_batch in ((PlainVanillaOption, calculate_option_price_BS_batch),
+                                          (BarrierOption, calculate_barrier_option_price_BS_batch)):
+            options = [product for product in self.product_list if isinstance(product, option_class)]
+            if options:
+                groups.append((options, price_batch))
+        
+        for start in range(0, len(relative_spot), block):
+            scenarios = relative_spot[start:start + block][newaxis, :]
+            volatility_scenarios = 1.0 if relative_volatility is None else asarray(relative_volatility, dtype=float64)[start:start + block][newaxis, :]
+            for options, price_batch in groups:
+                position = array([option.get_position_sign() * option.contract_size * option.multiplier for option in options])
+                # a remaining maturity of zero is replaced by a tiny one, the formulas then return the payoff
+                remaining = maximum(array([option.T for option in options], dtype=float64) - horizon, 1e-12)
+                arguments = (array([option.S0 for option in options])[:, newaxis] * scenarios,
+                             array([option.K for option in options])[:, newaxis], remaining[:, newaxis],
+                             array([option.r for option in options])[:, newaxis],
+                             array([option.s for option in options])[:, newaxis] * volatility_scenarios,
+                             array([option.option_type for option in options])[:, newaxis])
+                if price_batch is calculate_barrier_option_price_BS_batch:
+                    arguments = arguments + (array([option.barrier_type for option in options])[:, newaxis],
+                                             array([option.barrier for option in options])[:, newaxis],
+                                             array([option.q for option in options])[:, newaxis],
+                                             array([option.rebate for option in options])[:, newaxis])
+                values[start:start + block] += position @ price_batch(*arguments)
+        
+        # the rest of the products keep today's price
+        for product in self.product_list:
+            if not isinstance(product, (PlainVanillaOption, BarrierOption)):
+                values += product.get_position_sign() * product.price * product.contract_size * product.multiplier
+        
+        return values
+    
+    # Method that computes the Value at Risk and Expected Shortfall of the portfolio with Monte Carlo simulation.
+    # The scenarios of the underlying are simulated once (with the rate and volatility of the first product, the
+    # underlying being the same for all the products) on the grid of the horizons, in years, and the whole portfolio
+    # is revalued on the same scenarios at every horizon. The profit and loss is measured against today's value with
+    # the closed-end formulas. Returns a structured array with the VaR and ES per horizon and confidence level.
+    # With a HestonModel as model the spot price and its variance are simulated together, and every leg is revalued
+    # with its volatility scaled by the move of the volatility of the model, sqrt(v/v0)
+    def calculate_portfolio_VAR(self, confidence_levels=(0.95, 0.99), horizons=(1/252, 10/252), config=None, model=None):
+        if config is None:
+            config = MonteCarloConfig(I=10000)
+        horizons = sort(atleast_1d(asarray(horizons, dtype=float64)))
+        underlying = self.product_list[0]
+        
+        # today's value from the same revaluation, on the scenario of an unchanged spot price
+        value = self.calculate_scenario_values(ones(1))[0]
+        
+        if model is None:
+            engine = MonteCarloEngine(config, 'path', times=horizons)
+        else:
+            engine = HestonMonteCarloEngine(config, model, 'variance', times=horizons)
+        pnl = empty((len(horizons), config.I))
+        start = 0
+        for paths in engine.generate_chunks(1.0, underlying.r, underlying.s, horizons[-1]):
+            n = paths.shape[-1]
+            for i, horizon in enumerate(horizons):
+                if model is None:
+                    pnl[i, start:start + n] = self.calculate_scenario_values(paths[i + 1], horizon) - value
+                else:
+                    pnl[i, start:start + n] = self.calculate_scenario_values(exp(paths[0, i + 1]), horizon,
+                                                                             sqrt(maximum(paths[1, i + 1] / model.v0, 1e-8))) - value
+            start = start + n
+        
+        table = get_risk_table(pnl[:, :start], horizons, confidence_levels)
+        print_risk_table(self.name, table)
+        
+        return table
+    
+    # Method that computes the Value at Risk and Expected Shortfall of the portfolio with historical simulation.
+    # Every past move of the ticker over horizon days (overlapping windows of the last window days, all the history by
+    # default) is applied to today's spot price and the whole portfolio is revalued on all the scenarios at once.
+    # weighting='age' weights the scenarios by age with the factor decay, filtered=True rescales the daily returns
+    # to today's EWMA volatility (factor filter_decay). Returns a structured array with the VaR and ES per confidence level
+    def calculate_historical_VAR(self, market_data=None, ticker='ATHENS GENERAL INDEX', confidence_levels=(0.95, 0.99),
+                                 horizon=1, window=None, weighting=None, decay=0.98, filtered=False, filter_decay=0.94):
+        if market_data is None:
+            market_data = MarketData()
+        
+        returns = market_data.get_log_returns(ticker)
+        if filtered:
+            returns = get_filtered_returns(returns, filter_decay)
+        returns = get_horizon_returns(returns, horizon)
+        if window is not None:
+            returns = returns[-window:]
+        
+        weights = None
+        if weighting == 'age':
+            weights = get_age_weights(len(returns), decay)[newaxis, :]
+        elif weighting is not None:
+            print("Please give either age or None for the weighting of the scenarios")
+        
+        value = self.calculate_scenario_values(ones(1))[0]
+        pnl = self.calculate_scenario_values(exp(returns), horizon / 252) - value
+        
+        table = get_risk_table(pnl[newaxis, :], horizon / 252, confidence_levels, weights)
+        print_risk_table(self.name, table)
+        
+        return table
+    
+    # Method that prices the products of the portfolio with Monte Carlo simulation,
+    # each product draws from its own independent sub-stream of the configuration's seed.
+    # With a ParallelMonteCarloExecutor the paths of all the products are spread over its worker processes
+    def calculate_option_prices_MC(self, config=None, executor=None):
+        if config is None:
+            config = MonteCarloConfig()
+        streams = config.spawn(len(self.product_list))
+        simulated = [(product, stream) for product, stream in zip(self.product_list, streams)
+                     if isinstance(product, (PlainVanillaOption, BarrierOption))]
+        
+        if executor is None:
+            for product, stream in simulated:
+                product.calculate_option_price_MC_BS(stream)
+        else:
+            estimates = executor.calculate_estimates([(product, stream, {}) for product, stream in simulated])
+            for (product, stream), estimate in zip(simulated, estimates):
+                product.price = estimate.get_price()
+                product.std_error = estimate.get_std_error()
+                product.payoff = product.get_option_payoff()
+        
+        for product in self.product_list:
+            if not isinstance(product, (PlainVanillaOption, BarrierOption)):
+                product.calculate_option_price_BS_formula()
         
     # Method that calculates the premium required for the portfolio after adding up all the products
     def calculate_premium_strategy(self):
@@ -25,29 +294,22 @@ class Portfolio:
         print('The premium for the strategy stands at: ', round(premium,2), ' Euros')
         self.premium = premium
 
-    # Method that calculates the payoff for different spot prices and generates the relevant option's strategy graph
-    def calculate_payoff_strategy(self):
+    # Method that calculates the payoff for different spot prices, the relevant option's strategy graph is only drawn with plot=True.
+    # Every product evaluates its own payoff on the portfolio's spot grid, one row of a (products x spot prices) matrix
+    def calculate_payoff_strategy(self, plot=False):
         
-        ceiling = math.ceil(2 * self.product_list[0].S0) # assuming that the underlying is the same for all the options, we put a limit of the spot price as 2x the current price
-        spot_price_table = linspace(0, ceiling, ceiling*10, endpoint=False)  #create the table of spot prices so as to compute the payoff
+        spot_price_table = self.get_spot_price_table()  #create the table of spot prices so as to compute the payoff
+        payoffs = array([product.get_option_payoff(spot_price_table) for product in self.product_list]).reshape(-1, len(spot_price_table))
         
-        payoff = [0]*len(spot_price_table)
-        for product in self.product_list:
-            payoff = list( map(add, payoff, product.payoff) )
-            
-        payoff = payoff + self.premium
-        
-        # Graph showing the option strategy
-        pyplot.title(self.name)
-        pyplot.plot(spot_price_table, payoff)
-        pyplot.grid(True)
-        pyplot.xlabel('Price of the Underlying')
-        pyplot.ylabel('Profit & Loss')
-        pyplot.show()
-                    
-                    
-     
-
-
-                
-            
\ No newline at end of file
+        payoff = payoffs.sum(axis=0) + self.premium
+        
+        if plot:
+            self.plot_payoff_strategy(spot_price_table, payoff)
+        
+        return spot_price_table, payoff
+    
+    # Method that generates the option's strategy graph
+    def plot_payoff_strategy(self, spot_price_table=None, payoff=None):
+        if spot_price_table is None:
+            spot_price_table, payoff = self.calculate_payoff_strategy()
+        Reporting.plot_payoff_strategy(self.name, spot_price_table, payoff)
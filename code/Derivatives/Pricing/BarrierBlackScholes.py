@@ -0,0 +1,143 @@
+from numpy import *
+from scipy.special import ndtr
+from Derivatives.Pricing.BlackScholes import get_option_sign, calculate_option_price_BS_batch
+
+# Vectorized closed-end formulas for single barrier options (Reiner & Rubinstein,
+# in the notation of Haug, "The Complete Guide to Option Pricing Formulas").
+# All eight in/out, up/down, call/put cases are written as combinations of the
+# same six terms A-F, so the normal cdf evaluations and the powers of (barrier/S0)
+# are computed once for the whole batch and the case only selects the weights.
+# Knock-in options pay the rebate at maturity if the barrier was never reached,
+# knock-out options pay it as soon as the barrier is reached.
+
+BARRIER_TYPES = ('down-and-in', 'down-and-out', 'up-and-in', 'up-and-out')
+
+# Weights of the terms A, B, C, D per case, indexed by [knock-in, down barrier, call, strike above the barrier]
+BARRIER_WEIGHTS = zeros((2, 2, 2, 2, 4))
+BARRIER_WEIGHTS[1, 1, 1, 1] = [0, 0, 1, 0]     # down-and-in call,  K > H: C + E
+BARRIER_WEIGHTS[1, 1, 1, 0] = [1, -1, 0, 1]    # down-and-in call,  K < H: A - B + D + E
+BARRIER_WEIGHTS[1, 0, 1, 1] = [1, 0, 0, 0]     # up-and-in call,    K > H: A + E
+BARRIER_WEIGHTS[1, 0, 1, 0] = [0, 1, -1, 1]    # up-and-in call,    K < H: B - C + D + E
+BARRIER_WEIGHTS[1, 1, 0, 1] = [0, 1, -1, 1]    # down-and-in put,   K > H: B - C + D + E
+BARRIER_WEIGHTS[1, 1, 0, 0] = [1, 0, 0, 0]     # down-and-in put,   K < H: A + E
+BARRIER_WEIGHTS[1, 0, 0, 1] = [1, -1, 0, 1]    # up-and-in put,     K > H: A - B + D + E
+BARRIER_WEIGHTS[1, 0, 0, 0] = [0, 0, 1, 0]     # up-and-in put,     K < H: C + E
+BARRIER_WEIGHTS[0, 1, 1, 1] = [1, 0, -1, 0]    # down-and-out call, K > H: A - C + F
+BARRIER_WEIGHTS[0, 1, 1, 0] = [0, 1, 0, -1]    # down-and-out call, K < H: B - D + F
+BARRIER_WEIGHTS[0, 0, 1, 1] = [0, 0, 0, 0]     # up-and-out call,   K > H: F
+BARRIER_WEIGHTS[0, 0, 1, 0] = [1, -1, 1, -1]   # up-and-out call,   K < H: A - B + C - D + F
+BARRIER_WEIGHTS[0, 1, 0, 1] = [1, -1, 1, -1]   # down-and-out put,  K > H: A - B + C - D + F
+BARRIER_WEIGHTS[0, 1, 0, 0] = [0, 0, 0, 0]     # down-and-out put,  K < H: F
+BARRIER_WEIGHTS[0, 0, 0, 1] = [0, 1, 0, -1]    # up-and-out put,    K > H: B - D + F
+BARRIER_WEIGHTS[0, 0, 0, 0] = [1, 0, -1, 0]    # up-and-out put,    K < H: A - C + F
+
+# Split the barrier type(s) into knock-in and down barrier masks,
+# integer barrier types are taken as positions in BARRIER_TYPES
+def get_barrier_masks(barrier_type):
+    barrier_type = asarray(barrier_type)
+    if barrier_type.dtype.kind in 'iu':
+        valid = (barrier_type >= 0) & (barrier_type < len(BARRIER_TYPES))
+        if not valid.all():
+            print("Please give a barrier type of down-and-in, down-and-out, up-and-in or up-and-out")
+        return valid & (barrier_type % 2 == 0), valid & (barrier_type < 2), valid
+    valid = isin(barrier_type, BARRIER_TYPES)
+    if not valid.all():
+        print("Please give a barrier type of down-and-in, down-and-out, up-and-in or up-and-out")
+    is_in = (barrier_type == 'down-and-in') | (barrier_type == 'up-and-in')
+    is_down = (barrier_type == 'down-and-in') | (barrier_type == 'down-and-out')
+    return is_in, is_down, valid
+
+# Get barrier option prices using the closed-end formulas for arrays of contracts
+def calculate_barrier_option_price_BS_batch(S0, K, T, r, s, option_type, barrier_type, barrier, q=0.0, rebate=0.0):
+    S0, K, T, r, s, barrier, q, rebate = (asarray(x, dtype=float64) for x in (S0, K, T, r, s, barrier, q, rebate))
+    phi = get_option_sign(option_type)
+    is_in, is_down, valid = get_barrier_masks(barrier_type)
+    eta = where(is_down, 1.0, -1.0)
+
+    # Parameters mu, lamda and the x, y, z of the closed-end formulas
+    s_sqrt_T = s * sqrt(T)
+    mu = (r - q - s**2/2) / s**2
+    lamda = sqrt(mu**2 + 2*r/s**2)
+    x1 = log(S0/K)/s_sqrt_T + (1 + mu)*s_sqrt_T
+    x2 = log(S0/barrier)/s_sqrt_T + (1 + mu)*s_sqrt_T
+    y1 = log(barrier**2/(S0*K))/s_sqrt_T + (1 + mu)*s_sqrt_T
+    y2 = log(barrier/S0)/s_sqrt_T + (1 + mu)*s_sqrt_T
+    z = log(barrier/S0)/s_sqrt_T + lamda*s_sqrt_T
+
+    # powers of (barrier/S0) and discounted spot and strike, shared by all the terms
+    ratio = barrier/S0
+    ratio_2mu_2 = ratio**(2*(mu + 1))
+    ratio_2mu = ratio**(2*mu)
+    forward = S0*exp(-q*T)
+    discounted_strike = K*exp(-r*T)
+
+    A = phi*forward*ndtr(phi*x1) - phi*discounted_strike*ndtr(phi*(x1 - s_sqrt_T))
+    B = phi*forward*ndtr(phi*x2) - phi*discounted_strike*ndtr(phi*(x2 - s_sqrt_T))
+    N_y2 = ndtr(eta*(y2 - s_sqrt_T))
+    C = phi*forward*ratio_2mu_2*ndtr(eta*y1) - phi*discounted_strike*ratio_2mu*ndtr(eta*(y1 - s_sqrt_T))
+    D = phi*forward*ratio_2mu_2*ndtr(eta*y2) - phi*discounted_strike*ratio_2mu*N_y2
+    E = rebate*exp(-r*T)*(ndtr(eta*(x2 - s_sqrt_T)) - ratio_2mu*N_y2)
+    F = rebate*(ratio**(mu + lamda)*ndtr(eta*z) + ratio**(mu - lamda)*ndtr(eta*(z - 2*lamda*s_sqrt_T)))
+
+    # weights of A, B, C, D for the case of each contract
+    is_call = phi > 0
+    weights = BARRIER_WEIGHTS[is_in.astype(int), is_down.astype(int), is_call.astype(int), (K > barrier).astype(int)]
+    weights = moveaxis(weights, -1, 0)
+    option_price = weights[0]*A + weights[1]*B + weights[2]*C + weights[3]*D + where(is_in, E, F)
+
+    # contracts already beyond the barrier: knock-in options are plain vanilla, knock-out options pay the rebate
+    breached = where(is_down, S0 <= barrier, S0 >= barrier)
+    if breached.any():
+        vanilla = calculate_option_price_BS_batch(S0, K, T, r, s, option_type, q)
+        option_price = where(breached, where(is_in, vanilla, rebate), option_price)
+
+    option_price = where(valid & ~isnan(phi), option_price, nan)
+
+    return option_price
+
+# Relative spot bump and absolute volatility, maturity and rate bumps of the bump-and-reprice Greeks
+BUMP_SPOT = 1e-3
+BUMP_VOLATILITY = 1e-3
+BUMP_MATURITY = 1e-4
+BUMP_RATE = 1e-4
+
+# Get the Greeks of arrays of barrier options by bump-and-reprice with central differences.
+# All the bumped scenarios are stacked on a leading axis and priced in one pass of the closed-end formulas.
+# The Greeks follow the conventions of calculate_option_greeks_BS_batch (theta and charm per year of calendar time)
+def calculate_barrier_option_greeks_BS_batch(S0, K, T, r, s, option_type, barrier_type, barrier, q=0.0, rebate=0.0):
+    S0, K, T, r, s, barrier, q, rebate = broadcast_arrays(*(asarray(x, dtype=float64) for x in (S0, K, T, r, s, barrier, q, rebate)))
+    option_type = broadcast_to(asarray(option_type), S0.shape)
+    barrier_type = broadcast_to(asarray(barrier_type), S0.shape)
+
+    hS = BUMP_SPOT * S0
+    hs = BUMP_VOLATILITY
+    hT = minimum(BUMP_MATURITY, T / 2)
+    hr = BUMP_RATE
+
+    # scenarios: base, spot -/+, vol -/+, maturity -/+, rate -/+, spot x vol -/+ and spot x maturity -/+
+    spot_steps = array([0, -1, 1, 0, 0, 0, 0, 0, 0, -1, 1, -1, 1, -1, 1, -1, 1])
+    vol_steps = array([0, 0, 0, -1, 1, 0, 0, 0, 0, -1, -1, 1, 1, 0, 0, 0, 0])
+    maturity_steps = array([0, 0, 0, 0, 0, -1, 1, 0, 0, 0, 0, 0, 0, -1, -1, 1, 1])
+    rate_steps = array([0, 0, 0, 0, 0, 0, 0, -1, 1, 0, 0, 0, 0, 0, 0, 0, 0])
+    steps = (slice(None),) + (newaxis,) * S0.ndim
+
+    prices = calculate_barrier_option_price_BS_batch(S0 + spot_steps[steps] * hS, K, T + maturity_steps[steps] * hT,
+                                                     r + rate_steps[steps] * hr, s + vol_steps[steps] * hs,
+                                                     option_type, barrier_type, barrier, q, rebate)
+    (base, spot_down, spot_up, vol_down, vol_up, maturity_down, maturity_up, rate_down, rate_up,
+     spot_down_vol_down, spot_up_vol_down, spot_down_vol_up, spot_up_vol_up,
+     spot_down_maturity_down, spot_up_maturity_down, spot_down_maturity_up, spot_up_maturity_up) = prices
+
+    delta = (spot_up - spot_down) / (2 * hS)
+    gamma = (spot_up - 2 * base + spot_down) / hS**2
+    vega = (vol_up - vol_down) / (2 * hs)
+    theta = -(maturity_up - maturity_down) / (2 * hT)
+    rho = (rate_up - rate_down) / (2 * hr)
+    vanna = (spot_up_vol_up - spot_down_vol_up - spot_up_vol_down + spot_down_vol_down) / (4 * hS * hs)
+    volga = (vol_up - 2 * base + vol_down) / hs**2
+    charm = -(spot_up_maturity_up - spot_down_maturity_up - spot_up_maturity_down + spot_down_maturity_down) / (4 * hS * hT)
+
+    greeks = {'delta': delta, 'gamma': gamma, 'vega': vega, 'theta': theta, 'rho': rho,
+              'vanna': vanna, 'volga': volga, 'charm': charm}
+
+    return greeks
@@ -0,0 +1,70 @@
+from numpy import *
+from scipy.special import ndtr
+
+# Vectorized Black & Scholes pricing for whole option chains.
+# Every argument may be a scalar or a NumPy array, all of them are broadcast
+# against each other so a full chain is priced in a single pass.
+
+# Map the option type(s) to +1 for calls and -1 for puts (nan for anything else),
+# numeric option types are taken as the signs themselves
+def get_option_sign(option_type):
+    option_type = asarray(option_type)
+    if option_type.dtype.kind in 'iuf':
+        sign = where((option_type == 1) | (option_type == -1), option_type, nan).astype(float64)
+    else:
+        sign = where(option_type == 'call', 1.0, where(option_type == 'put', -1.0, nan))
+    if isnan(sign).any():
+        print("Give a proper option type")
+    return sign
+
+# Parameters d1 and d2 of the Black & Scholes formula
+def calculate_d1_d2(S0, K, T, r, s, q=0.0):
+    S0, K, T, r, s, q = (asarray(x, dtype=float64) for x in (S0, K, T, r, s, q))
+    s_sqrt_T = s * sqrt(T)
+    d1 = (log(S0/K) + (r - q + (s**2/2))*T)/s_sqrt_T
+    d2 = d1 - s_sqrt_T
+    return d1, d2
+
+# Get option prices using the closed-end formula of Black & Scholes for arrays of contracts
+def calculate_option_price_BS_batch(S0, K, T, r, s, option_type, q=0.0):
+    S0, K, T, r, s, q = (asarray(x, dtype=float64) for x in (S0, K, T, r, s, q))
+    sign = get_option_sign(option_type)
+
+    d1, d2 = calculate_d1_d2(S0, K, T, r, s, q)
+
+    # call: S0*N(d1) - K*exp(-rT)*N(d2), put: K*exp(-rT)*N(-d2) - S0*N(-d1)
+    option_price = sign * (S0*exp(-q * T)*ndtr(sign*d1) - K*exp(-r * T)*ndtr(sign*d2))
+
+    return option_price
+
+# Get the first and second order Greeks of arrays of contracts from one evaluation of d1, d2 and the normal pdf/cdf
+def calculate_option_greeks_BS_batch(S0, K, T, r, s, option_type, q=0.0):
+    S0, K, T, r, s, q = (asarray(x, dtype=float64) for x in (S0, K, T, r, s, q))
+    sign = get_option_sign(option_type)
+
+    d1, d2 = calculate_d1_d2(S0, K, T, r, s, q)
+    sqrt_T = sqrt(T)
+    dividend_discount = exp(-q * T)
+    strike_discount = K * exp(-r * T)
+
+    # shared normal evaluations, N(+-d1) and N(+-d2) depending on call or put
+    pdf_d1 = exp(-0.5 * d1**2) / sqrt(2 * pi)
+    cdf_d1 = ndtr(sign * d1)
+    cdf_d2 = ndtr(sign * d2)
+
+    delta = sign * dividend_discount * cdf_d1
+    gamma = dividend_discount * pdf_d1 / (S0 * s * sqrt_T)
+    vega = S0 * dividend_discount * pdf_d1 * sqrt_T
+    theta = (-S0 * dividend_discount * pdf_d1 * s / (2 * sqrt_T)
+             - sign * r * strike_discount * cdf_d2
+             + sign * q * S0 * dividend_discount * cdf_d1)
+    rho = sign * T * strike_discount * cdf_d2
+    vanna = -dividend_discount * pdf_d1 * d2 / s
+    volga = vega * d1 * d2 / s
+    charm = (sign * q * dividend_discount * cdf_d1
+             - dividend_discount * pdf_d1 * (2 * (r - q) * T - d2 * s * sqrt_T) / (2 * T * s * sqrt_T))
+
+    greeks = {'delta': delta, 'gamma': gamma, 'vega': vega, 'theta': theta, 'rho': rho,
+              'vanna': vanna, 'volga': volga, 'charm': charm}
+
+    return greeks
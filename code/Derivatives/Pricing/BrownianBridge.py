@@ -0,0 +1,63 @@
+import math
+from numpy import *
+
+# Brownian bridge construction of Brownian paths on the time grid t_1 < ... < t_M
+# (by default the uniform grid dt, 2dt, ..., M*dt = T).
+# The first normal fixes the end point W(T), the next ones the mid points of the
+# remaining intervals, so the leading (best distributed) dimensions of a Sobol
+# point carry most of the variance of the path.
+class BrownianBridge:
+
+    def __init__(self, M, T, times=None):
+        if times is None:
+            times = T * arange(1, M + 1) / M
+        times = asarray(times, dtype=float64)
+        M = len(times)
+        self.M = M
+        self.times = times
+
+        # order in which the points are filled in, with the known neighbours and their weights
+        self.bridge_index = zeros(M, dtype=int64)
+        self.left_index = zeros(M, dtype=int64)
+        self.right_index = zeros(M, dtype=int64)
+        self.left_weight = zeros(M)
+        self.right_weight = zeros(M)
+        self.std_dev = zeros(M)
+
+        filled = zeros(M, dtype=bool)
+        filled[M - 1] = True
+        self.bridge_index[0] = M - 1
+        self.std_dev[0] = math.sqrt(times[M - 1])
+
+        j = 0
+        for i in range(1, M):
+            # next interval (j-1, k) with unknown points inside, fill in its mid point l
+            while filled[j]:
+                j = j + 1
+            k = j
+            while not filled[k]:
+                k = k + 1
+            l = j + ((k - 1 - j) >> 1)
+            filled[l] = True
+            self.bridge_index[i] = l
+            self.left_index[i] = j
+            self.right_index[i] = k
+            left_time = times[j - 1] if j > 0 else 0.0
+            self.left_weight[i] = (times[k] - times[l]) / (times[k] - left_time)
+            self.right_weight[i] = (times[l] - left_time) / (times[k] - left_time)
+            self.std_dev[i] = math.sqrt((times[l] - left_time) * (times[k] - times[l]) / (times[k] - left_time))
+            j = k + 1
+            if j >= M:
+                j = 0
+
+    # Turn a (M x n) block of standard normals into the (M x n) Brownian increments of n paths
+    def build_increments(self, Z):
+        W = empty_like(Z)
+        W[self.bridge_index[0]] = self.std_dev[0] * Z[0]
+        for i in range(1, self.M):
+            j, k, l = self.left_index[i], self.right_index[i], self.bridge_index[i]
+            W[l] = self.right_weight[i] * W[k] + self.std_dev[i] * Z[i]
+            if j > 0:
+                W[l] += self.left_weight[i] * W[j - 1]
+        W[1:] -= W[:-1].copy()
+        return W
@@ -0,0 +1,221 @@
+import math
+from numpy import *
+from scipy.linalg import solve_banded
+from Derivatives.Pricing.BlackScholes import get_option_sign, calculate_option_price_BS_batch
+
+# Finite-difference solver of the Black & Scholes PDE
+#   dV/dtau = 0.5*s^2*S^2*V'' + (r-q)*S*V' - r*V,  tau the time to maturity,
+# with Crank-Nicolson time steps started by Rannacher steps (fully implicit half steps that damp the
+# kink of the payoff) on a non-uniform spot grid, every step being one tridiagonal solve with
+# scipy.linalg.solve_banded. The time steps grow quadratically from maturity, where the solution moves fastest.
+# American options are held above their intrinsic value with a penalty iteration (a few solves per step), which
+# keeps the time stepping second order where a projection after the solve would make it first order.
+# Knock-out barriers are the edge of the grid with the rebate as absorbing boundary value, knock-in options
+# follow from the in-out parity. One solve gives the price, delta and gamma on the whole spot grid.
+
+# Non-uniform spot grid of n+1 points on [lower, upper], dense around every one of the centers (e.g. the strike and
+# the barrier): the grid is uniform in the coordinate sum(asinh((S - center) / width)), width = concentration * center,
+# which is the sinh stretching for one center (the smaller concentration the denser the grid near a center)
+def get_spot_grid(lower, upper, centers, n, concentration=0.1):
+    centers = atleast_1d(asarray(centers, dtype=float64))
+    widths = where(centers > 0, concentration * centers, concentration)
+
+    def get_coordinate(S):
+        return arcsinh((asarray(S, dtype=float64)[..., newaxis] - centers) / widths).sum(axis=-1)
+
+    def get_density(S):
+        return (1 / sqrt(widths**2 + (asarray(S, dtype=float64)[..., newaxis] - centers)**2)).sum(axis=-1)
+
+    start, end = get_coordinate(lower), get_coordinate(upper)
+    target = linspace(start, end, n + 1)[1:-1]
+    # the coordinate is inverted with Newton steps from a linear interpolation on a fine grid
+    fine = linspace(lower, upper, 20 * n + 1)
+    grid = interp(target, get_coordinate(fine), fine)
+    for iteration in range(3):
+        grid = clip(grid - (get_coordinate(grid) - target) / get_density(grid), lower, upper)
+    return concatenate(([lower], grid, [upper]))
+
+# Weights of the three-point first and second derivatives on a non-uniform grid, for the interior nodes
+def get_derivative_weights(grid):
+    h_down = grid[1:-1] - grid[:-2]
+    h_up = grid[2:] - grid[1:-1]
+    first = (-h_up / (h_down * (h_down + h_up)), (h_up - h_down) / (h_down * h_up), h_down / (h_up * (h_down + h_up)))
+    second = (2 / (h_down * (h_down + h_up)), -2 / (h_down * h_up), 2 / (h_up * (h_down + h_up)))
+    return first, second
+
+# First and second derivatives of values on the grid (one-sided at the edges)
+def calculate_grid_derivatives(grid, values):
+    first, second = get_derivative_weights(grid)
+    delta = empty_like(values)
+    gamma = empty_like(values)
+    delta[1:-1] = (first[0] * values[:-2].T + first[1] * values[1:-1].T + first[2] * values[2:].T).T
+    gamma[1:-1] = (second[0] * values[:-2].T + second[1] * values[1:-1].T + second[2] * values[2:].T).T
+    delta[0] = (values[1] - values[0]) / (grid[1] - grid[0])
+    delta[-1] = (values[-1] - values[-2]) / (grid[-1] - grid[-2])
+    gamma[0], gamma[-1] = gamma[1], gamma[-2]
+    return delta, gamma
+
+# Weight of the penalty that holds American options on their exercise value
+PENALTY = 1e8
+
+# Crank-Nicolson / Rannacher time stepping of columns of terminal values on the grid.
+# boundary_function(tau) gives the (2 x columns) values at the lower and upper edges at time to maturity tau,
+# exercise_values (grid, or None) the values the solution has to stay above (one column only),
+# max_penalty_iterations the number of penalized solves per step at most.
+# Returns the values at tau = T and one step before (for theta)
+def solve_PDE(grid, values, T, r, s, q, boundary_function, time_steps=200, rannacher_steps=4, exercise_values=None,
+              max_penalty_iterations=10):
+    first, second = get_derivative_weights(grid)
+    S = grid[1:-1]
+    # L V = lower*V[i-1] + diagonal*V[i] + upper*V[i+1] on the interior nodes
+    diffusion = 0.5 * s**2 * S**2
+    drift = (r - q) * S
+    lower = diffusion * second[0] + drift * first[0]
+    diagonal = diffusion * second[1] + drift * first[1] - r
+    upper = diffusion * second[2] + drift * first[2]
+
+    # times to maturity tau_k = T*(k/N)^2; Rannacher: the first steps are replaced by two fully implicit half steps each,
+    # the last (longest) step is split in two so that theta comes from a short step
+    taus = T * (arange(time_steps + 1) / time_steps) ** 2
+    dts = diff(taus)
+    steps = ([(dt / 2, 1.0) for dt in dts[:rannacher_steps] for half in (0, 1)] + [(dt, 0.5) for dt in dts[rannacher_steps:-1]]
+             + [(dts[-1] / 2, 0.5)] * 2)
+
+    n = len(grid)
+    values = array(values, dtype=float64)
+    matrix = zeros((3, n))
+    tau = 0.0
+    previous = values
+    for step, theta in steps:
+        tau_new = tau + step
+        # explicit part (I + (1-theta)*dt*L) V on the interior
+        right_side = values.copy()
+        if theta < 1:
+            explicit = (1 - theta) * step
+            right_side[1:-1] += explicit * ((lower * values[:-2].T).T + (diagonal * values[1:-1].T).T + (upper * values[2:].T).T)
+        # implicit part (I - theta*dt*L), Dirichlet rows at the edges
+        implicit = theta * step
+        matrix[1, 1:-1] = 1 - implicit * diagonal
+        matrix[0, 2:] = -implicit * upper
+        matrix[2, :-2] = -implicit * lower
+        matrix[1, 0], matrix[1, -1] = 1.0, 1.0
+        matrix[0, 1], matrix[2, -2] = 0.0, 0.0
+        boundary = boundary_function(tau_new)
+        right_side[0], right_side[-1] = boundary[0], boundary[1]
+
+        previous = values
+        values = solve_banded((1, 1), matrix, right_side, check_finite=False)
+        if exercise_values is not None:
+            # penalty iteration: a large weight pulls the nodes below their exercise value onto it, the solve is
+            # repeated until the set of these nodes stops changing
+            exercised = values < exercise_values
+            for iteration in range(max_penalty_iterations):
+                penalty = where(exercised, PENALTY, 0.0)
+                penalized = matrix.copy()
+                penalized[1] += penalty
+                values = solve_banded((1, 1), penalized, right_side + penalty * exercise_values, check_finite=False)
+                now_exercised = values < exercise_values
+                if array_equal(now_exercised, exercised):
+                    break
+                exercised = now_exercised
+            maximum(values, exercise_values, out=values)
+        tau = tau_new
+    return values, previous, steps[-1][0]
+
+# Black & Scholes prices of a plain vanilla option on the spot grid, with the node S = 0 (where the formula
+# divides by zero) at its limit: nothing for a call, the discounted strike for a put
+def get_vanilla_prices(grid, K, T, r, s, option_type, q=0.0):
+    prices = empty_like(grid)
+    start = 1 if grid[0] == 0 else 0
+    prices[start:] = calculate_option_price_BS_batch(grid[start:], K, T, r, s, option_type, q)
+    if start:
+        prices[0] = K * math.exp(-r * T) if get_option_sign(option_type) < 0 else 0.0
+    return prices
+
+# Solve the PDE of a plain vanilla or single barrier option and return the price, delta, gamma and theta
+# on the spot grid (theta from the last time step). spot_steps and time_steps set the size of the grid
+def solve_option_PDE(S0, K, T, r, s, option_type, q=0.0, barrier_type=None, barrier=None, rebate=0.0, american=False,
+                     spot_steps=800, time_steps=200, rannacher_steps=4, concentration=0.1):
+    sign = float(get_option_sign(option_type))
+    width = 5 * s * math.sqrt(T)
+    lower, upper = 0.0, (S0 if S0 > K else K) * math.exp(width)
+    is_in = barrier_type is not None and barrier_type.endswith('-in')
+    if barrier_type is not None:
+        if barrier_type not in ('down-and-in', 'down-and-out', 'up-and-in', 'up-and-out'):
+            print("Please give a barrier type of down-and-in, down-and-out, up-and-in or up-and-out")
+        if american and is_in:
+            print("Early exercise is only available for plain vanilla and knock-out options")
+        if barrier_type.startswith('down'):
+            lower = barrier
+        else:
+            upper = barrier
+    # the grid is dense around both the strike (when it is inside the grid) and the barrier
+    centers = [K] if lower < K < upper else []
+    if barrier is not None:
+        centers.append(barrier)
+    grid = get_spot_grid(lower, upper, centers if centers else [S0], spot_steps, concentration)
+
+    payoff = maximum(sign * (grid - K), 0)
+    exercise_values = None
+
+    if barrier_type is None:
+        # plain vanilla: the put is worth the discounted strike at S = 0 and the call the discounted forward far up
+        def boundary_function(tau):
+            low = K * math.exp(-r * tau) if sign < 0 else 0.0
+            high = upper * math.exp(-q * tau) - K * math.exp(-r * tau) if sign > 0 else 0.0
+            if american:
+                low, high = float(maximum(low, sign * (lower - K))), float(maximum(high, sign * (upper - K)))
+            return array([low, high])
+        columns = payoff
+        if american:
+            exercise_values = payoff
+    else:
+        # columns: knock-out option without rebate, probability-weighted value of 1 paid at the hit, and of 1 paid
+        # at maturity without a hit (the edge on the barrier side absorbs, the far edge follows the vanilla option)
+        down = barrier_type.startswith('down')
+        def boundary_function(tau):
+            vanilla_edge = upper * math.exp(-q * tau) - K * math.exp(-r * tau) if sign > 0 else K * math.exp(-r * tau) - lower * math.exp(-q * tau)
+            far = float(maximum(vanilla_edge, 0.0)) if (down and sign > 0) or (not down and sign < 0) else 0.0
+            far_survival = math.exp(-r * tau)
+            if down:
+                return array([[0.0, 1.0, 0.0], [far, 0.0, far_survival]])
+            return array([[far, 0.0, far_survival], [0.0, 1.0, 0.0]])
+        columns = stack((payoff, zeros_like(grid), ones_like(grid)), axis=1)
+        if down:
+            columns[0] = (0.0, 1.0, 0.0)
+        else:
+            columns[-1] = (0.0, 1.0, 0.0)
+
+    if barrier_type is not None and american and not is_in:
+        # American knock-out: the exercise decision needs the knock-out value with its rebate, solved as one column
+        combined = columns[:, 0] + rebate * columns[:, 1]
+        def combined_boundary(tau):
+            return boundary_function(tau)[:, 0] + rebate * boundary_function(tau)[:, 1]
+        values, previous, dt = solve_PDE(grid, combined, T, r, s, q, combined_boundary, time_steps, rannacher_steps, payoff)
+    else:
+        values, previous, dt = solve_PDE(grid, columns, T, r, s, q, boundary_function, time_steps, rannacher_steps, exercise_values)
+        if barrier_type is not None:
+            knock_out, hit, survival = values.T
+            knock_out_previous, hit_previous, survival_previous = previous.T
+            if is_in:
+                vanilla = get_vanilla_prices(grid, K, T, r, s, option_type, q)
+                vanilla_previous = get_vanilla_prices(grid, K, T - dt, r, s, option_type, q)
+                values = vanilla - knock_out + rebate * survival
+                previous = vanilla_previous - knock_out_previous + rebate * survival_previous
+            else:
+                values = knock_out + rebate * hit
+                previous = knock_out_previous + rebate * hit_previous
+
+    delta, gamma = calculate_grid_derivatives(grid, values)
+    theta = -(values - previous) / dt
+    return {'spot': grid, 'price': values, 'delta': delta, 'gamma': gamma, 'theta': theta}
+
+# Values of a PDE surface at the spot price S0, by quadratic interpolation on the three nearest grid points
+def interpolate_PDE_surface(surface, S0):
+    grid = surface['spot']
+    i = int(clip(searchsorted(grid, S0), 1, len(grid) - 2))
+    x0, x1, x2 = grid[i - 1], grid[i], grid[i + 1]
+    weights = array([(S0 - x1) * (S0 - x2) / ((x0 - x1) * (x0 - x2)),
+                     (S0 - x0) * (S0 - x2) / ((x1 - x0) * (x1 - x2)),
+                     (S0 - x0) * (S0 - x1) / ((x2 - x0) * (x2 - x1))])
+    return {key: float(weights @ values[i - 1:i + 2]) for key, values in surface.items() if key != 'spot'}
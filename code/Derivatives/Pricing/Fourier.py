@@ -0,0 +1,151 @@
+import math
+from numpy import *
+from scipy.interpolate import CubicSpline
+from Derivatives.Pricing.BlackScholes import get_option_sign
+
+# Characteristic-function pricers of European options for whole strike ladders:
+#   fft  Carr-Madan: the damped call price is the Fourier transform of a function of the characteristic function,
+#        one FFT of N points gives the call prices on a grid of N log strikes, which is interpolated on the strikes,
+#   cos  Fang-Oosterlee: the density of the log return is expanded in N cosines on a truncated range,
+#        the prices of all the strikes are one (strikes x N) matrix product with the cosine coefficients.
+# Both only need the characteristic function of X = log(S_T/S0) under the risk neutral measure, given for:
+#   black_scholes  s,
+#   heston         v0, kappa, theta, sigma, rho  (initial variance, mean reversion, long-run variance, vol of vol,
+#                  correlation of the spot and variance shocks),
+#   merton         s, jump_intensity, jump_mean, jump_std  (lognormal jumps of the log spot price).
+# Puts follow from the put-call parity.
+
+CHARACTERISTIC_MODELS = ('black_scholes', 'heston', 'merton')
+FOURIER_METHODS = ('fft', 'cos')
+
+# Characteristic function u -> E[exp(i*u*X)] of the log return X = log(S_T/S0) of a model
+def get_characteristic_function(model, T, r, q=0.0, **parameters):
+    drift = r - q
+    if model == 'black_scholes':
+        s = parameters['s']
+        def characteristic_function(u):
+            return exp(1j * u * (drift - s**2 / 2) * T - s**2 * u**2 * T / 2)
+    elif model == 'heston':
+        v0, kappa, theta = parameters['v0'], parameters['kappa'], parameters['theta']
+        sigma, rho = parameters['sigma'], parameters['rho']
+        def characteristic_function(u):
+            # "little Heston trap" form of Albrecher et al., continuous in u for all maturities
+            beta = kappa - rho * sigma * 1j * u
+            d = sqrt(beta**2 + sigma**2 * (1j * u + u**2))
+            g = (beta - d) / (beta + d)
+            decay = exp(-d * T)
+            C = kappa * theta / sigma**2 * ((beta - d) * T - 2 * log((1 - g * decay) / (1 - g)))
+            D = (beta - d) / sigma**2 * (1 - decay) / (1 - g * decay)
+            return exp(1j * u * drift * T + C + D * v0)
+    elif model == 'merton':
+        s, intensity = parameters['s'], parameters['jump_intensity']
+        jump_mean, jump_std = parameters['jump_mean'], parameters['jump_std']
+        # compensator of the jumps so that the discounted spot price stays a martingale
+        compensator = intensity * (math.exp(jump_mean + jump_std**2 / 2) - 1)
+        def characteristic_function(u):
+            jumps = intensity * T * (exp(1j * u * jump_mean - jump_std**2 * u**2 / 2) - 1)
+            return exp(1j * u * (drift - s**2 / 2 - compensator) * T - s**2 * u**2 * T / 2 + jumps)
+    else:
+        print("Please give black_scholes, heston or merton for the model")
+        return None
+    return characteristic_function
+
+# Puts from the calls of the same strikes where the sign is -1, with the put-call parity
+# (the small negative prices that truncation leaves on far out-of-the-money options are floored at 0)
+def apply_put_call_parity(calls, S0, K, T, r, q, option_type):
+    sign = get_option_sign(option_type)
+    puts = calls - S0 * math.exp(-q * T) + K * math.exp(-r * T)
+    return maximum(where(sign > 0, calls, puts), 0)
+
+# Get European option prices for a ladder of strikes of one maturity with the Carr-Madan FFT.
+# N points of the transform with spacing eta, alpha the damping of the call price in the log strike
+def calculate_option_prices_FFT(S0, K, T, r, option_type, model='black_scholes', q=0.0, N=4096, eta=0.25, alpha=1.5,
+                                **parameters):
+    K = asarray(K, dtype=float64)
+    characteristic_function = get_characteristic_function(model, T, r, q, **parameters)
+    # log strikes k = log(K/S0) on a grid of N points centred on the spot price
+    spacing = 2 * pi / (N * eta)
+    b = N * spacing / 2
+    v = eta * arange(N)
+    log_strikes = -b + spacing * arange(N)
+
+    psi = math.exp(-r * T) * characteristic_function(v - (alpha + 1) * 1j) / (alpha**2 + alpha - v**2 + 1j * (2 * alpha + 1) * v)
+    # Simpson weights of the integral over v
+    simpson = (3 + (-1.0) ** arange(1, N + 1)) / 3
+    simpson[0] = 1 / 3
+    transform = fft.fft(exp(1j * b * v) * psi * eta * simpson)
+    calls = S0 * exp(-alpha * log_strikes) / pi * transform.real
+
+    calls = CubicSpline(log_strikes, calls)(log(K / S0))
+    return apply_put_call_parity(calls, S0, K, T, r, q, option_type)
+
+# Cumulants c1, c2 and c4 of the log return from central differences of the log of the characteristic function at 0
+def get_cumulants(characteristic_function, h=1e-2):
+    up_2, up, centre, down, down_2 = log(characteristic_function(h * array([2.0, 1.0, 0.0, -1.0, -2.0])))
+    c1 = ((8 * (up - down) - (up_2 - down_2)) / (12j * h)).real
+    c2 = (-(16 * (up + down) - (up_2 + down_2) - 30 * centre) / (12 * h**2)).real
+    c4 = ((up_2 - 4 * up + 6 * centre - 4 * down + down_2) / h**4).real
+    return c1, c2, c4
+
+# Number of cosine terms of the COS method on a range of the given width: the smallest power of two from 64 for which
+# the characteristic function has fallen below tolerance at the last frequency N*pi/width, so the number of terms
+# grows with the width of the range and with the slower decay of stochastic volatility models
+def get_COS_terms(characteristic_function, width, tolerance=1e-8, max_N=65536):
+    N = 64
+    while N < max_N and abs(characteristic_function(N * pi / width)) > tolerance:
+        N = 2 * N
+    if abs(characteristic_function(N * pi / width)) > tolerance:
+        print("The characteristic function has not decayed within", max_N, "cosine terms, the COS prices may be inaccurate")
+    return N
+
+# Get European option prices for a ladder of strikes of one maturity with the COS method:
+# N cosine terms on the range of the log return c1 +/- L*sqrt(c2 + sqrt(c4)), widened to hold the log moneyness of every strike.
+# By default (N None) the number of terms is chosen from the width of the range, see get_COS_terms
+def calculate_option_prices_COS(S0, K, T, r, option_type, model='black_scholes', q=0.0, N=None, L=10, tolerance=1e-8,
+                                max_N=65536, **parameters):
+    K = asarray(K, dtype=float64)
+    characteristic_function = get_characteristic_function(model, T, r, q, **parameters)
+    c1, c2, c4 = get_cumulants(characteristic_function)
+    # y = log(S_T/K) = x + X with x = log(S0/K), truncated to [a, b] for all the strikes at once
+    x = log(S0 / K)
+    width = L * math.sqrt(c2 + math.sqrt(abs(c4)))
+    a = float(x.min()) + c1 - width
+    b = float(x.max()) + c1 + width
+    # the put payoff lives on [a, 0], the range has to hold y = 0
+    a = a if a < 0 else -width / L
+    b = b if b > 0 else width / L
+    if N is None:
+        N = get_COS_terms(characteristic_function, b - a, tolerance, max_N)
+
+    k = arange(N)
+    u = k * pi / (b - a)
+    # cosine coefficients of the put payoff K*(1 - exp(y)) on [a, 0], per unit of strike
+    chi = (cos(-u * a) + u * sin(-u * a) - exp(a)) / (1 + u**2)
+    psi = empty(N)
+    psi[0] = -a
+    psi[1:] = sin(-u[1:] * a) / u[1:]
+    coefficients = 2 / (b - a) * (psi - chi)
+    coefficients[0] /= 2
+
+    # Re(phi(u) * exp(i*u*(x - a))) of every strike and term, summed as two real matrix products
+    weights = characteristic_function(u) * coefficients
+    angles = outer(x - a, u)
+    puts = K * math.exp(-r * T) * (cos(angles) @ weights.real - sin(angles) @ weights.imag).reshape(K.shape)
+
+    calls = puts + S0 * math.exp(-q * T) - K * math.exp(-r * T)
+    return apply_put_call_parity(calls, S0, K, T, r, q, option_type)
+
+# Get European option prices for a ladder of strikes of one maturity with the fft or cos method
+def calculate_option_prices_Fourier(S0, K, T, r, option_type, model='black_scholes', q=0.0, method='cos', **settings):
+    if method == 'fft':
+        return calculate_option_prices_FFT(S0, K, T, r, option_type, model, q, **settings)
+    elif method == 'cos':
+        return calculate_option_prices_COS(S0, K, T, r, option_type, model, q, **settings)
+    print("Please give fft or cos for the Fourier method")
+    return None
+
+# Get a (maturities x strikes) surface of European option prices, one strike ladder per maturity
+def calculate_option_surface_Fourier(S0, K, maturities, r, option_type, model='black_scholes', q=0.0, method='cos',
+                                     **settings):
+    return stack([calculate_option_prices_Fourier(S0, K, T, r, option_type, model, q, method, **settings)
+                  for T in atleast_1d(maturities)])
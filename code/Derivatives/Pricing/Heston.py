@@ -0,0 +1,172 @@
+import math
+from numpy import *
+from scipy.special import ndtr
+from Derivatives.Pricing.MonteCarloEngine import MonteCarloEngine
+
+# Heston stochastic volatility model
+#   dS = (r - q) S dt + sqrt(v) S dW1,   dv = kappa (theta - v) dt + sigma sqrt(v) dW2,   dW1 dW2 = rho dt
+# simulated with the quadratic-exponential (QE) scheme of Andersen: the variance of the next step is drawn from
+# a squared normal when its distribution is not too skewed (psi <= psi_critical) and from a mixture of a mass at
+# zero and an exponential otherwise, both matching the exact conditional mean and variance, so the variance
+# stays positive even when the Feller condition fails. The log spot price is stepped with the trapezoidal
+# integral of the variance and the martingale correction, so that the discounted spot price is a martingale
+# for any step size. All the paths of a block are stepped together, one NumPy operation per time step.
+
+# Parameters of the Heston model: initial variance v0, mean reversion speed kappa, long-run variance theta,
+# volatility of the variance sigma and correlation rho of the spot and variance shocks
+class HestonModel:
+
+    def __init__(self, v0, kappa, theta, sigma, rho):
+        self.v0 = v0
+        self.kappa = kappa
+        self.theta = theta
+        self.sigma = sigma
+        self.rho = rho
+        if not -1 <= rho <= 1:
+            print("Please give a correlation between -1 and 1")
+
+    def __eq__(self, other):
+        return isinstance(other, HestonModel) and self.get_key() == other.get_key()
+
+    def __hash__(self):
+        return hash(self.get_key())
+
+    def __repr__(self):
+        return 'HestonModel(v0=%r, kappa=%r, theta=%r, sigma=%r, rho=%r)' % self.get_key()
+
+    def get_key(self):
+        return (self.v0, self.kappa, self.theta, self.sigma, self.rho)
+
+    # Parameters in the form of the characteristic function of the Fourier pricers
+    def get_parameters(self):
+        return {'v0': self.v0, 'kappa': self.kappa, 'theta': self.theta, 'sigma': self.sigma, 'rho': self.rho}
+
+    # Volatility of today's variance
+    def get_volatility(self):
+        return math.sqrt(self.v0)
+
+
+# Monte Carlo engine for the Heston model with the QE scheme, a drop-in replacement of the GBM engine
+# (the volatility argument s of its methods is ignored, the variance follows the model).
+# In 'terminal' mode only the spot prices at maturity are kept (the variance is still stepped over the
+# M steps of the configuration), in 'path' mode the spot price paths on the time grid, and in 'variance'
+# mode a (2 x steps+1 x n) block with the log spot price and the variance paths.
+# The paths are simulated in the dtype of the configuration, the normals come from the configuration's stream
+# (two per step: the variance and the spot price shocks), with antithetic variates and moment matching as for GBM
+class HestonMonteCarloEngine(MonteCarloEngine):
+
+    def __init__(self, config=None, model=None, mode='terminal', antithetic=False, moment_matching=False, times=None,
+                 psi_critical=1.5):
+        MonteCarloEngine.__init__(self, config, 'path', antithetic, moment_matching, times)
+        if mode not in ('terminal', 'path', 'variance'):
+            print("Please give terminal, path or variance for the simulation mode")
+        if model is None:
+            print("Please give a HestonModel")
+        self.mode = mode
+        self.model = model
+        self.psi_critical = psi_critical
+        self.dtype = dtype(self.config.dtype)
+
+    # Simulate n paths of the log spot price and of the variance on the time grid, returned as two (steps+1) x n
+    # matrices, or only their last rows (1 x n) without keep_paths
+    def generate_heston_paths(self, S0, r, T, n, q=0.0, keep_paths=True):
+        model = self.model
+        kappa, theta, sigma, rho = model.kappa, model.theta, model.sigma, model.rho
+        times = self.get_times(T)
+        steps = len(times)
+        dt = diff(times, prepend=0.0)
+
+        # constants of every step: moments of the variance and the coefficients of the log spot step (gamma1 = gamma2 = 1/2)
+        decay = exp(-kappa * dt)
+        variance_weight = sigma**2 * decay * (1 - decay) / kappa
+        constant_variance = theta * sigma**2 * (1 - decay)**2 / (2 * kappa)
+        K1 = 0.5 * dt * (kappa * rho / sigma - 0.5) - rho / sigma
+        K2 = 0.5 * dt * (kappa * rho / sigma - 0.5) + rho / sigma
+        K3 = 0.5 * dt * (1 - rho**2)
+        A = K2 + 0.5 * K3
+        K0 = -rho * kappa * theta / sigma * dt
+        drift = (r - q) * dt
+        # the constants in the precision of the paths, float64 scalars would promote float32 paths
+        decay, variance_weight, constant_variance, K0, K1, K2, K3, A, drift = (
+            x.astype(self.dtype) for x in (decay, variance_weight, constant_variance, K0, K1, K2, K3, A, drift))
+
+        Z = self.generate_normals((2 * steps, n), self.dtype)
+        rows = steps + 1 if keep_paths else 1
+        log_S = empty((rows, n), dtype=self.dtype)
+        V = empty((rows, n), dtype=self.dtype)
+        current_log_S = full(n, math.log(S0), dtype=self.dtype)
+        current_V = full(n, model.v0, dtype=self.dtype)
+        if keep_paths:
+            log_S[0], V[0] = current_log_S, current_V
+
+        # log E[exp(A V')] is nan where the expectation is infinite, those paths are handled in the step
+        with errstate(invalid='ignore', divide='ignore'):
+            for k in range(steps):
+                Z_V, Z_S = Z[2 * k], Z[2 * k + 1]
+                m = theta + (current_V - theta) * decay[k]
+                psi = current_V * variance_weight[k]
+                psi += constant_variance[k]
+                psi /= m * m
+
+                # squared normal branch for all the paths, V' = a (b + Z)^2, and log E[exp(A V')] for the martingale correction
+                inverse_psi = 2 / minimum(psi, self.psi_critical)
+                b2 = sqrt(inverse_psi * (inverse_psi - 1))
+                b2 += inverse_psi - 1
+                a = m / (1 + b2)
+                next_V = sqrt(b2) + Z_V
+                next_V *= next_V
+                next_V *= a
+                b2 *= a
+                moment = 1 - (2 * A[k]) * a
+                log_moment = A[k] * b2 / moment - 0.5 * log(moment)
+
+                # exponential branch where psi > psi_critical: V' = 0 with probability p, else exponential with rate beta
+                # (from the uniform of the same normal Z_V, so antithetic and Sobol draws carry over)
+                exponential = flatnonzero(psi > self.psi_critical)
+                if exponential.size:
+                    psi_e, m_e = psi[exponential], m[exponential]
+                    p = (psi_e - 1) / (psi_e + 1)
+                    beta = (1 - p) / m_e
+                    U = ndtr(Z_V[exponential])
+                    next_V[exponential] = where(U <= p, 0, log((1 - p) / maximum(1 - U, 1e-30)) / beta)
+                    log_moment[exponential] = where(beta > A[k], log(p + beta * (1 - p) / (beta - A[k])), nan)
+
+                # with A > 0 the expectation is infinite for very large steps, those paths take the plain drift K0 instead
+                if A[k] > 0:
+                    invalid = flatnonzero(~isfinite(log_moment))
+                    log_moment[invalid] = -(K0[k] + (K1[k] + 0.5 * K3[k]) * current_V[invalid])
+
+                # log spot step: drift - log E[exp(A V')] - K3/2 V + K2 V' + sqrt(K3 (V + V')) Z, with K0 and K1 V absorbed
+                # in the martingale correction
+                current_log_S += drift[k]
+                current_log_S -= log_moment
+                current_log_S += K2[k] * next_V - (0.5 * K3[k]) * current_V
+                # the diffusion term is built in the buffer of the variance of the last step, which is not needed any more
+                diffusion = current_V
+                diffusion += next_V
+                diffusion *= K3[k]
+                sqrt(diffusion, out=diffusion)
+                diffusion *= Z_S
+                current_log_S += diffusion
+                current_V = next_V
+                if keep_paths:
+                    log_S[k + 1], V[k + 1] = current_log_S, current_V
+
+        if not keep_paths:
+            log_S[0], V[0] = current_log_S, current_V
+        return log_S, V
+
+    # Simulate n end-of-period spot prices, the variance being stepped over the time grid
+    def generate_terminal_values(self, S0, r, s, T, n, q=0.0):
+        return exp(self.generate_heston_paths(S0, r, T, n, q, keep_paths=False)[0][0])
+
+    # Simulate n spot price paths on the time grid, returned as a (steps+1) x n matrix
+    def generate_paths(self, S0, r, s, T, n, q=0.0):
+        return exp(self.generate_heston_paths(S0, r, T, n, q)[0])
+
+    def generate_block(self, S0, r, s, T, n, q=0.0):
+        if self.mode == 'variance':
+            return stack(self.generate_heston_paths(S0, r, T, n, q))
+        elif self.mode == 'terminal':
+            return self.generate_terminal_values(S0, r, s, T, n, q)
+        return self.generate_paths(S0, r, s, T, n, q)
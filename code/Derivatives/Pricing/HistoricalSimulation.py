@@ -0,0 +1,30 @@
+from numpy import *
+from Derivatives.Pricing.Volatility import calculate_EWMA_variance
+
+# Scenarios of historical simulation built from a history of daily log returns (oldest first).
+# Besides the plain equally likely scenarios, the scenarios can be age-weighted
+# (Boudoukh, Richardson & Whitelaw: the probability of a day decays geometrically with its age)
+# or filtered (Hull & White: every return is rescaled by today's volatility over the volatility
+# of its own day, both from an EWMA of the squared returns).
+
+# Probabilities of n scenarios ordered from the oldest to the newest, decaying by the factor decay per day of age
+def get_age_weights(n, decay=0.98):
+    if decay == 1:
+        # no decay: the scenarios are equally likely
+        return full(n, 1 / n)
+    age = arange(n - 1, -1, -1)
+    weights = decay ** age * (1 - decay) / (1 - decay ** n)
+    return weights
+
+# Daily returns rescaled to today's volatility
+def get_filtered_returns(returns, decay=0.94):
+    returns = asarray(returns, dtype=float64)
+    volatility = sqrt(calculate_EWMA_variance(returns, decay))
+    return returns * volatility[-1] / volatility[:-1]
+
+# Returns over horizon days from daily returns (overlapping windows)
+def get_horizon_returns(returns, horizon=1):
+    if horizon == 1:
+        return asarray(returns, dtype=float64)
+    cumulative = concatenate(([0.0], cumsum(returns, dtype=float64)))
+    return cumulative[horizon:] - cumulative[:-horizon]
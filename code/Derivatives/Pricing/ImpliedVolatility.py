@@ -0,0 +1,95 @@
+import math
+from numpy import *
+from scipy.special import ndtr
+from Derivatives.Pricing.BlackScholes import get_option_sign, calculate_d1_d2
+
+# Vectorized implied volatility solver for whole quote surfaces.
+# Every quote starts from the Corrado-Miller closed-form approximation and is
+# refined with Halley steps on vega and volga. Each quote keeps a bracket
+# [lower, upper] on the volatility (the price is increasing in the volatility)
+# and falls back to bisection whenever a step leaves the bracket, so every quote
+# inside the no-arbitrage bounds converges.
+
+# Black & Scholes price, vega and volga from one evaluation of d1 and d2
+def calculate_price_vega_volga(S0, K, T, r, s, sign, q):
+    d1, d2 = calculate_d1_d2(S0, K, T, r, s, q)
+    forward = S0 * exp(-q * T)
+    price = sign * (forward * ndtr(sign * d1) - K * exp(-r * T) * ndtr(sign * d2))
+    vega = forward * exp(-0.5 * d1**2) / math.sqrt(2 * math.pi) * sqrt(T)
+    volga = vega * d1 * d2 / s
+    return price, vega, volga
+
+# Corrado-Miller approximation of the implied volatility (Brenner-Subrahmanyam where it has no real root)
+def calculate_initial_volatility(price, S0, K, T, r, sign, q):
+    forward = S0 * exp(-q * T)
+    discounted_strike = K * exp(-r * T)
+    # puts are turned into calls through the put-call parity
+    call_price = where(sign > 0, price, price + forward - discounted_strike)
+    moneyness = forward - discounted_strike
+    a = call_price - moneyness / 2
+    root = a**2 - moneyness**2 / math.pi
+    corrado_miller = math.sqrt(2 * math.pi) / (forward + discounted_strike) * (a + sqrt(maximum(root, 0))) / sqrt(T)
+    brenner_subrahmanyam = math.sqrt(2 * math.pi) * call_price / (forward * sqrt(T))
+    return where(root > 0, corrado_miller, brenner_subrahmanyam)
+
+# Get the implied volatilities of arrays of option prices.
+# Returns the volatilities and a flag per quote telling whether it converged,
+# quotes outside the no-arbitrage bounds get nan and False
+def calculate_implied_volatility_batch(price, S0, K, T, r, option_type, q=0.0,
+                                       tol=1e-10, max_iter=50, s_min=1e-4, s_max=5.0):
+    sign = get_option_sign(option_type)
+    price, S0, K, T, r, q, sign = broadcast_arrays(*(asarray(x, dtype=float64) for x in (price, S0, K, T, r, q, sign)))
+    shape = price.shape
+    price, S0, K, T, r, q, sign = (x.ravel() for x in (price, S0, K, T, r, q, sign))
+
+    # no-arbitrage bounds of the prices
+    forward = S0 * exp(-q * T)
+    discounted_strike = K * exp(-r * T)
+    lower_bound = maximum(sign * (forward - discounted_strike), 0)
+    upper_bound = where(sign > 0, forward, discounted_strike)
+    valid = (price > lower_bound) & (price < upper_bound) & ~isnan(sign)
+
+    volatility = full(price.shape, nan)
+    converged = zeros(price.shape, dtype=bool)
+    lower = full(price.shape, s_min)
+    upper = full(price.shape, s_max)
+    previous_difference = full(price.shape, inf)
+    volatility[valid] = clip(calculate_initial_volatility(price, S0, K, T, r, sign, q)[valid], s_min, s_max)
+
+    active = flatnonzero(valid)
+    for iteration in range(max_iter):
+        if active.size == 0:
+            break
+        s = volatility[active]
+        model_price, vega, volga = calculate_price_vega_volga(S0[active], K[active], T[active], r[active],
+                                                              s, sign[active], q[active])
+        difference = model_price - price[active]
+
+        done = abs(difference) <= tol
+        converged[active[done]] = True
+
+        # shrink the bracket around the root
+        too_high = difference > 0
+        upper[active] = where(too_high, s, upper[active])
+        lower[active] = where(too_high, lower[active], s)
+
+        # Halley step (plain Newton where the Halley correction is extreme),
+        # bisection when the step leaves the bracket, vega vanishes or the error does not halve
+        with errstate(divide='ignore', invalid='ignore', over='ignore'):
+            newton = difference / vega
+            correction = 1 - 0.5 * newton * volga / vega
+            correction = where((correction > 0.5) & (correction < 2), correction, 1)
+            s_new = s - newton / correction
+        slow = abs(difference) > 0.5 * previous_difference[active]
+        previous_difference[active] = abs(difference)
+        outside = ~isfinite(s_new) | (s_new <= lower[active]) | (s_new >= upper[active]) | slow
+        s_new = where(outside, 0.5 * (lower[active] + upper[active]), s_new)
+
+        # the bracket can no longer be narrowed in floating point
+        stalled = (upper[active] - lower[active]) <= 1e-15 * upper[active]
+        converged[active[stalled & ~done]] = True
+
+        volatility[active] = where(done, s, s_new)
+        active = active[~(done | stalled)]
+
+    return volatility.reshape(shape), converged.reshape(shape)
@@ -0,0 +1,147 @@
+import math
+from numpy import *
+from Derivatives.Pricing.BlackScholes import get_option_sign, calculate_option_price_BS_batch
+
+# Lattice pricers for European and American options:
+#   crr            Cox-Ross-Rubinstein binomial tree, u = exp(s*sqrt(dt)), d = 1/u,
+#   leisen_reimer  Leisen-Reimer binomial tree (Peizer-Pratt inversion), centred on the strike, odd number of steps,
+#   trinomial      Boyle trinomial tree, u = exp(s*sqrt(2*dt)), with a middle branch that keeps the spot price.
+# The backward induction runs over NumPy slices of one buffer of option values per tree (O(N) memory),
+# the early exercise being a maximum with the intrinsic values of the nodes of the step.
+# With smoothing the last step of the crr and trinomial trees uses the Black & Scholes price of the
+# remaining period, which removes the odd-even oscillation of their error, and with richardson the price
+# is extrapolated from the trees with N and N/2 steps. The extrapolation is on by default only for the
+# Leisen-Reimer tree, the one with a smooth error in N: the error of the crr and trinomial trees still moves with
+# the position of the strike between the nodes, and extrapolating it can make the price worse (opt-in there).
+# Delta, gamma and theta are read from the first steps of the tree.
+
+LATTICE_METHODS = ('crr', 'leisen_reimer', 'trinomial')
+
+# Peizer-Pratt method 2 inversion of the normal cdf used by the Leisen-Reimer tree
+def calculate_peizer_pratt(z, N):
+    sign = 1.0 if z >= 0 else -1.0
+    return 0.5 + sign * 0.5 * math.sqrt(1 - math.exp(-(z / (N + 1/3 + 0.1/(N + 1)))**2 * (N + 1/6)))
+
+# Up and down factors and probabilities of a binomial tree with N steps
+def get_binomial_parameters(S0, K, T, r, s, q, N, method):
+    dt = T / N
+    growth = math.exp((r - q) * dt)
+    if method == 'leisen_reimer':
+        d1 = (math.log(S0 / K) + (r - q + s**2 / 2) * T) / (s * math.sqrt(T))
+        d2 = d1 - s * math.sqrt(T)
+        p = calculate_peizer_pratt(d2, N)
+        p_star = calculate_peizer_pratt(d1, N)
+        u = growth * p_star / p
+        d = (growth - p * u) / (1 - p)
+    else:
+        u = math.exp(s * math.sqrt(dt))
+        d = 1 / u
+        p = (growth - d) / (u - d)
+    return u, d, p
+
+# Get the price and the delta, gamma and theta of one option on a lattice with N steps
+def calculate_option_lattice(S0, K, T, r, s, option_type, q=0.0, N=200, method='leisen_reimer', american=True, smoothing=True):
+    sign = float(get_option_sign(option_type))
+    if method not in LATTICE_METHODS:
+        print("Please give crr, leisen_reimer or trinomial for the lattice method")
+    trinomial = method == 'trinomial'
+    # the Greeks are read from the first two steps, the tree needs at least three
+    N = N if N >= 3 else 3
+    if method == 'leisen_reimer' and N % 2 == 0:
+        N = N + 1
+    # the Black & Scholes smoothing replaces the last step of the tree, it needs a tree of at least 3 steps
+    smoothing = smoothing and method != 'leisen_reimer' and N > 3
+    dt = T / N
+    discount = math.exp(-r * dt)
+
+    if trinomial:
+        u = math.exp(s * math.sqrt(2 * dt))
+        d = 1 / u
+        up = math.exp(s * math.sqrt(dt / 2))
+        growth = math.exp((r - q) * dt / 2)
+        p_up = ((growth - 1 / up) / (up - 1 / up))**2
+        p_down = ((up - growth) / (up - 1 / up))**2
+        weights = (discount * p_down, discount * (1 - p_up - p_down), discount * p_up)
+        width = 2
+    else:
+        u, d, p = get_binomial_parameters(S0, K, T, r, s, q, N, method)
+        weights = (discount * (1 - p), discount * p)
+        width = 1
+    log_u, log_d = math.log(u), math.log(d)
+
+    # spot prices of the nodes of step i, from the lowest to the highest
+    def get_spot_prices(i, out):
+        nodes = width * i + 1
+        j = arange(nodes, dtype=float64)
+        if trinomial:
+            log_spot = math.log(S0) + (j - i) * log_u
+        else:
+            log_spot = math.log(S0) + j * log_u + (i - j) * log_d
+        return exp(log_spot, out=out[:nodes])
+
+    spot = empty(width * N + 1)
+    values = empty(width * N + 1)
+    buffer = empty(width * N + 1)
+
+    last = N - 1 if smoothing else N
+    get_spot_prices(last, spot)
+    nodes = width * last + 1
+    if smoothing:
+        values[:nodes] = calculate_option_price_BS_batch(spot[:nodes], K, dt, r, s, option_type, q)
+    else:
+        values[:nodes] = maximum(sign * (spot[:nodes] - K), 0)
+    if american:
+        maximum(values[:nodes], maximum(sign * (spot[:nodes] - K), 0), out=values[:nodes])
+
+    saved = {}
+    for i in range(last - 1, -1, -1):
+        nodes = width * i + 1
+        # continuation value: discounted expectation over the branches, written in place into the buffer
+        multiply(values[width:width + nodes], weights[-1], out=buffer[:nodes])
+        if trinomial:
+            buffer[:nodes] += weights[1] * values[1:1 + nodes]
+        values[:nodes] *= weights[0]
+        values[:nodes] += buffer[:nodes]
+        if american:
+            get_spot_prices(i, spot)
+            maximum(values[:nodes], sign * (spot[:nodes] - K), out=values[:nodes])
+        if i <= 2:
+            saved[i] = values[:nodes].copy()
+
+    price = float(values[0])
+    # Greeks from the nodes of the first steps (second step for the trinomial tree: its first step has a middle node)
+    if trinomial:
+        level = saved[1]
+        spots = S0 * array([d, 1.0, u])
+        delta = (level[2] - level[0]) / (spots[2] - spots[0])
+        gamma = ((level[2] - level[1]) / (spots[2] - spots[1]) - (level[1] - level[0]) / (spots[1] - spots[0])) / ((spots[2] - spots[0]) / 2)
+        theta = (level[1] - price) / dt
+    else:
+        level_1, level_2 = saved[1], saved[2]
+        delta = (level_1[1] - level_1[0]) / (S0 * u - S0 * d)
+        spots = S0 * array([d * d, u * d, u * u])
+        gamma = ((level_2[2] - level_2[1]) / (spots[2] - spots[1]) - (level_2[1] - level_2[0]) / (spots[1] - spots[0])) / ((spots[2] - spots[0]) / 2)
+        # the middle node of step 2 sits at S0*u*d, which is S0 only when u*d = 1 (not in the Leisen-Reimer tree):
+        # the value at S0 two steps ahead is interpolated on the three nodes of step 2 before the time difference
+        weights_S0 = array([(S0 - spots[1]) * (S0 - spots[2]) / ((spots[0] - spots[1]) * (spots[0] - spots[2])),
+                            (S0 - spots[0]) * (S0 - spots[2]) / ((spots[1] - spots[0]) * (spots[1] - spots[2])),
+                            (S0 - spots[0]) * (S0 - spots[1]) / ((spots[2] - spots[0]) * (spots[2] - spots[1]))])
+        theta = (float(weights_S0 @ level_2[:3]) - price) / (2 * dt)
+
+    return {'price': price, 'delta': float(delta), 'gamma': float(gamma), 'theta': float(theta)}
+
+# Get the price and Greeks of one option on a lattice, with Richardson extrapolation from N and N/2 steps:
+# 2*V(N) - V(N/2) for a first order error (all the trees with early exercise, and the smoothed crr and trinomial
+# trees), (4*V(N) - V(N/2))/3 for the second order error of the Leisen-Reimer tree on European options.
+# By default (richardson None) only the Leisen-Reimer tree is extrapolated
+def calculate_option_price_lattice(S0, K, T, r, s, option_type, q=0.0, N=200, method='leisen_reimer', american=True,
+                                   richardson=None, smoothing=True):
+    if richardson is None:
+        richardson = method == 'leisen_reimer'
+    fine = calculate_option_lattice(S0, K, T, r, s, option_type, q, N, method, american, smoothing)
+    if not richardson:
+        return fine
+    coarse = calculate_option_lattice(S0, K, T, r, s, option_type, q, N // 2, method, american, smoothing)
+    order = 2 if method == 'leisen_reimer' and not american else 1
+    factor = 2 ** order
+    return {greek: (factor * fine[greek] - coarse[greek]) / (factor - 1) for greek in fine}
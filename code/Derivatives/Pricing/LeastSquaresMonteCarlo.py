@@ -0,0 +1,108 @@
+import math
+from numpy import *
+from Derivatives.Pricing.BlackScholes import get_option_sign
+from Derivatives.Pricing.MonteCarloConfig import MonteCarloConfig
+from Derivatives.Pricing.MonteCarloEngine import MonteCarloEngine
+
+# Longstaff-Schwartz least-squares Monte Carlo for American and Bermudan options.
+# The exercise rule is learnt on a pilot set of paths: going backwards over the exercise dates, the
+# discounted cash flows of the in-the-money paths are regressed on a basis of functions of the spot
+# price (powers or Laguerre polynomials of S/K), and a path is exercised where the intrinsic value
+# beats the fitted continuation value. The price is then estimated out of sample on fresh paths,
+# generated in blocks by the Monte Carlo engine, with the exercise rule of the pilot, which gives a
+# low-biased estimate with a standard error and keeps the memory bounded by the block size.
+
+LSM_BASES = ('polynomial', 'laguerre')
+
+# Basis functions of the regression evaluated at x = S/K, one column per function (the constant first)
+def get_regression_basis(x, basis='laguerre', degree=3):
+    columns = [ones_like(x)]
+    if basis == 'laguerre':
+        # weighted Laguerre polynomials exp(-x/2) L_k(x), from the recurrence (k+1) L_k+1 = (2k+1-x) L_k - k L_k-1
+        weight = exp(-x / 2)
+        previous, current = ones_like(x), 1 - x
+        columns.append(weight * previous)
+        for k in range(1, degree):
+            columns.append(weight * current)
+            previous, current = current, ((2 * k + 1 - x) * current - k * previous) / (k + 1)
+    elif basis == 'polynomial':
+        power = ones_like(x)
+        for k in range(degree):
+            power = power * x
+            columns.append(power)
+    else:
+        print("Please give polynomial or laguerre for the regression basis")
+    return stack(columns, axis=-1)
+
+# Time grid of the simulation: the exercise dates before maturity (by default the M steps of the configuration,
+# an American option being exercisable on all of them) and the maturity
+def get_exercise_grid(T, M, exercise_times=None):
+    if exercise_times is None:
+        exercise_times = T * arange(1, M + 1) / M
+    exercise_times = asarray(exercise_times, dtype=float64)
+    exercise_times = exercise_times[(exercise_times > 0) & (exercise_times < T)]
+    return union1d(exercise_times, [T])
+
+# Regression coefficients of the continuation value at every exercise date before maturity,
+# from a (dates+1 x n) matrix of pilot paths (None where too few paths are in the money).
+# Every date is fitted with its normal equations X^T X b = X^T y (a (terms x terms) solve instead of a least-squares
+# fit of the in-the-money paths). The dates cannot be stacked into one batched solve: the target y of a date is the
+# cash flow of the exercise decisions taken at the later dates, which needs their fitted coefficients first
+def fit_exercise_rule(paths, times, K, r, sign, basis, degree):
+    intrinsic_T = maximum(sign * (paths[-1] - K), 0)
+    cash_flow = intrinsic_T.copy()
+    coefficients = [None] * (len(times) - 1)
+    for k in range(len(times) - 2, -1, -1):
+        cash_flow *= math.exp(-r * (times[k + 1] - times[k]))
+        spot = paths[k + 1]
+        intrinsic = maximum(sign * (spot - K), 0)
+        in_the_money = intrinsic > 0
+        if in_the_money.sum() <= degree + 1:
+            continue
+        X = get_regression_basis(spot[in_the_money] / K, basis, degree)
+        coefficients[k] = linalg.solve(X.T @ X, cash_flow[in_the_money] @ X)
+        continuation = X @ coefficients[k]
+        exercise = intrinsic[in_the_money] >= continuation
+        indices = flatnonzero(in_the_money)[exercise]
+        cash_flow[indices] = intrinsic[indices]
+    return coefficients
+
+# Get the Monte Carlo estimate of an American or Bermudan option price with the Longstaff-Schwartz method.
+# exercise_times lists the Bermudan exercise dates in years (by default every one of the M steps of the
+# configuration, approximating American exercise), pilot_paths the number of paths of the regression
+def calculate_option_estimate_LSM(S0, K, T, r, s, option_type, config=None, exercise_times=None, basis='laguerre',
+                                  degree=3, pilot_paths=None, q=0.0, antithetic=False, moment_matching=False,
+                                  target_std_error=None):
+    if config is None:
+        config = MonteCarloConfig(I=100000, M=50)
+    sign = float(get_option_sign(option_type))
+    times = get_exercise_grid(T, config.M, exercise_times)
+
+    # the pilot and the pricing paths come from independent sub-streams
+    pilot_config, pricing_config = config.spawn(2)
+    if pilot_paths is None:
+        pilot_paths = config.I if config.I < config.chunk_size else config.chunk_size
+    pilot_engine = MonteCarloEngine(pilot_config.replace(I=pilot_paths), 'path', antithetic, moment_matching, times)
+    coefficients = fit_exercise_rule(pilot_engine.generate_paths(S0, r, s, T, pilot_paths, q), times, K, r, sign, basis, degree)
+
+    # cash flows of exercised paths grow at the rate r up to maturity, where the engine discounts every payoff
+    growth = exp(r * (T - times))
+
+    def payoff_function(paths):
+        n = paths.shape[1]
+        payoff = zeros(n)
+        alive = arange(n)
+        for k in range(len(times) - 1):
+            if coefficients[k] is None or alive.size == 0:
+                continue
+            spot = paths[k + 1, alive]
+            intrinsic = maximum(sign * (spot - K), 0)
+            continuation = get_regression_basis(spot / K, basis, degree) @ coefficients[k]
+            exercise = (intrinsic > 0) & (intrinsic >= continuation)
+            payoff[alive[exercise]] = intrinsic[exercise] * growth[k]
+            alive = alive[~exercise]
+        payoff[alive] = maximum(sign * (paths[-1, alive] - K), 0)
+        return payoff
+
+    engine = MonteCarloEngine(pricing_config, 'path', antithetic, moment_matching, times)
+    return engine.calculate_discounted_payoff(S0, r, s, T, payoff_function, q, target_std_error=target_std_error)
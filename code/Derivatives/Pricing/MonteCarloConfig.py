@@ -0,0 +1,62 @@
+from numpy import *
+import copy
+
+# Settings of a Monte Carlo run: number of paths I, number of time steps M,
+# the block size used to generate the paths and the random number stream.
+# The stream is a numpy.random.Generator built from a bit generator (PCG64,
+# Philox, ...) and a SeedSequence, so a run can be repeated bit-for-bit from
+# its seed and independent sub-streams can be spawned per option or per worker.
+# With sampler='sobol' the normals come from scrambled Sobol points instead
+# (randomized quasi-Monte Carlo): the paths are split over a number of independent
+# scrambles (replicates) whose spread gives the error estimate, and multi-step
+# paths are built with a Brownian bridge. dtype ('float64' or 'float32') is the floating point type of the
+# paths of the stochastic volatility engine, whose single precision halves the memory and time of a block.
+class MonteCarloConfig:
+
+    def __init__(self, I=10000, M=50, seed=None, bit_generator='PCG64', chunk_size=100000,
+                 sampler='pseudo', replicates=16, brownian_bridge=True, dtype='float64'):
+        self.I = I
+        self.M = M
+        self.chunk_size = chunk_size
+        self.bit_generator = bit_generator
+        self.sampler = sampler
+        self.replicates = replicates
+        self.brownian_bridge = brownian_bridge
+        self.dtype = dtype
+        if sampler not in ('pseudo', 'sobol'):
+            print("Please give either pseudo or sobol for the sampler")
+        if not hasattr(random, bit_generator):
+            print("Please give a bit generator of numpy.random, e.g. PCG64 or Philox")
+        if dtype not in ('float64', 'float32'):
+            print("Please give either float64 or float32 for the dtype")
+        # without a seed fresh entropy is drawn, it stays available in seed_sequence.entropy to replay the run
+        if isinstance(seed, random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = random.SeedSequence(seed)
+        self.seed = self.seed_sequence.entropy
+
+    # Method that returns a new Generator positioned at the start of this configuration's stream
+    def get_generator(self):
+        bit_generator = getattr(random, self.bit_generator)
+        return random.Generator(bit_generator(self.seed_sequence))
+
+    # Method that spawns n configurations with the same settings and independent, reproducible sub-streams.
+    # Sub-stream i is always the same for a given seed, however many times spawn is called
+    def spawn(self, n):
+        entropy, spawn_key = self.seed_sequence.entropy, self.seed_sequence.spawn_key
+        children = [random.SeedSequence(entropy, spawn_key=spawn_key + (i,)) for i in range(n)]
+        return [self.replace(seed_sequence=child) for child in children]
+
+    # Method that returns a copy of the configuration with some of the settings changed
+    def replace(self, **settings):
+        config = copy.copy(self)
+        for setting, value in settings.items():
+            setattr(config, setting, value)
+        config.seed = config.seed_sequence.entropy
+        return config
+
+    # Settings and stream identifying the results of a run with this configuration
+    def get_key(self):
+        return (self.I, self.M, self.bit_generator, self.chunk_size, self.sampler, self.replicates, self.brownian_bridge,
+                self.seed_sequence.entropy, self.seed_sequence.spawn_key, self.dtype)
@@ -0,0 +1,304 @@
+import math
+from numpy import *
+from scipy.special import ndtri
+from scipy.stats import qmc
+from Derivatives.Pricing.MonteCarloConfig import MonteCarloConfig
+from Derivatives.Pricing.BrownianBridge import BrownianBridge
+
+# Running mean and variance of simulated (discounted) payoffs.
+# Blocks of payoffs are merged with the pairwise update of Chan et al. so the
+# memory used stays constant no matter how many paths are simulated.
+class MonteCarloEstimate:
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.sum_squared_deviations = 0.0
+
+    # Method that adds a block of simulated values to the running statistics
+    def add(self, values):
+        values = asarray(values, dtype=float64).ravel()
+        block = MonteCarloEstimate()
+        block.count = values.size
+        if block.count > 0:
+            block.mean = float(values.mean())
+            block.sum_squared_deviations = float(((values - block.mean)**2).sum())
+        self.merge(block)
+
+    # Method that merges the statistics of another estimate (e.g. another chunk of paths) into this one
+    def merge(self, other):
+        count = self.count + other.count
+        if count == 0:
+            return self
+        difference = other.mean - self.mean
+        self.mean = self.mean + difference * other.count / count
+        self.sum_squared_deviations = (self.sum_squared_deviations + other.sum_squared_deviations
+                                       + difference**2 * self.count * other.count / count)
+        self.count = count
+        return self
+
+    # the price is a NumPy scalar like the closed-form prices, so it broadcasts against payoff tables
+    def get_price(self):
+        return float64(self.mean)
+
+    def get_std_error(self):
+        if self.count < 2:
+            return nan
+        return math.sqrt(self.sum_squared_deviations / (self.count - 1) / self.count)
+
+
+# Running estimate of a payoff X corrected with a control variate Y of known mean.
+# The optimal coefficient beta = cov(X, Y) / var(Y) is taken from the co-moments,
+# which are merged block by block like the plain estimate.
+class ControlVariateEstimate(MonteCarloEstimate):
+
+    def __init__(self, control_mean=0.0):
+        MonteCarloEstimate.__init__(self)
+        self.control_mean = control_mean
+        self.control = MonteCarloEstimate()
+        self.sum_cross_deviations = 0.0
+
+    # Method that adds a block of simulated values together with the control values of the same paths
+    def add(self, values, control_values=None):
+        values = asarray(values, dtype=float64).ravel()
+        control_values = asarray(control_values, dtype=float64).ravel()
+        block = ControlVariateEstimate(self.control_mean)
+        block.count = values.size
+        block.control.add(control_values)
+        if block.count > 0:
+            block.mean = float(values.mean())
+            block.sum_squared_deviations = float(((values - block.mean)**2).sum())
+            block.sum_cross_deviations = float(((values - block.mean) * (control_values - block.control.mean)).sum())
+        self.merge(block)
+
+    def merge(self, other):
+        count = self.count + other.count
+        if count == 0:
+            return self
+        cross = (self.sum_cross_deviations + other.sum_cross_deviations
+                 + (other.mean - self.mean) * (other.control.mean - self.control.mean) * self.count * other.count / count)
+        MonteCarloEstimate.merge(self, other)
+        self.control.merge(other.control)
+        self.sum_cross_deviations = cross
+        return self
+
+    def get_beta(self):
+        if self.control.sum_squared_deviations == 0:
+            return 0.0
+        return self.sum_cross_deviations / self.control.sum_squared_deviations
+
+    def get_price(self):
+        return self.mean - self.get_beta() * (self.control.mean - self.control_mean)
+
+    # the residual variance var(X) * (1 - corr(X, Y)^2) is what remains after the correction
+    def get_std_error(self):
+        if self.count < 3:
+            return nan
+        residual = self.sum_squared_deviations - self.get_beta() * self.sum_cross_deviations
+        return math.sqrt((residual if residual > 0 else 0.0) / (self.count - 2) / self.count)
+
+
+# Randomized quasi-Monte Carlo estimate: every replicate is an independent scramble
+# of the Sobol sequence, the price is the mean of the replicate estimates and the
+# error estimate comes from their spread.
+class RandomizedQMCEstimate:
+
+    def __init__(self):
+        self.replicates = []
+        self.count = 0
+
+    # Method that adds the estimate of one scrambled replicate
+    def add_replicate(self, estimate):
+        self.replicates.append(estimate)
+        self.count = self.count + estimate.count
+
+    # Method that merges the replicates of another randomized QMC estimate into this one
+    def merge(self, other):
+        for estimate in other.replicates:
+            self.add_replicate(estimate)
+        return self
+
+    def get_price(self):
+        return float(mean([estimate.get_price() for estimate in self.replicates]))
+
+    def get_std_error(self):
+        if len(self.replicates) < 2:
+            return nan
+        prices = array([estimate.get_price() for estimate in self.replicates])
+        return float(prices.std(ddof=1) / math.sqrt(len(prices)))
+
+
+# Monte Carlo engine for Geometric Brownian Motion.
+# In 'terminal' mode only the end-of-period spot prices are generated (one normal
+# per path, exact for European payoffs). In 'path' mode full paths with M time
+# steps are generated. In 'increments' mode the blocks are the Brownian increments
+# of the paths on the time grid (M uniform steps, or the given times), for
+# payoffs that walk along the path themselves. In all modes the I paths are
+# produced in blocks of chunk_size paths, so at most (M+1) x chunk_size values
+# are held in memory.
+# Paths, steps, block size and random stream all come from a MonteCarloConfig,
+# antithetic variates and moment matching are switched on per engine.
+# With the 'sobol' sampler of the configuration the normals are taken from
+# scrambled Sobol points (one dimension per time step) and the paths are
+# built with a Brownian bridge.
+class MonteCarloEngine:
+
+    def __init__(self, config=None, mode='terminal', antithetic=False, moment_matching=False, times=None):
+        if config is None:
+            config = MonteCarloConfig()
+        self.config = config
+        self.I = config.I
+        self.M = config.M
+        self.chunk_size = config.chunk_size
+        self.generator = config.get_generator()
+        self.mode = mode
+        self.times = None if times is None else asarray(times, dtype=float64)
+        self.antithetic = antithetic
+        self.moment_matching = moment_matching
+        self.sampler = config.sampler
+        self.sobol = None
+        self.bridge = None
+        if self.sampler == 'sobol' and (antithetic or moment_matching):
+            print("Antithetic variates and moment matching only apply to the pseudo-random sampler")
+        if mode not in ('terminal', 'path', 'increments'):
+            print("Please give terminal, path or increments for the simulation mode")
+
+    # Draw standard normals with one column per path (the last axis).
+    # With antithetic variates the second half of the columns mirrors the first half,
+    # with moment matching every row is shifted and scaled to mean 0 and variance 1 exactly
+    # (the matched draws are no longer independent, so the reported standard error is a conservative bound)
+    def generate_normals(self, shape, dtype=float64):
+        shape = tuple(shape)
+        n = shape[-1]
+        if self.sampler == 'sobol':
+            return self.generate_sobol_normals(shape).astype(dtype, copy=False)
+        if self.antithetic:
+            Z = self.generator.standard_normal(shape[:-1] + (n // 2,), dtype=dtype)
+            Z = concatenate((Z, -Z), axis=-1)
+        else:
+            Z = self.generator.standard_normal(shape, dtype=dtype)
+        if self.moment_matching and n > 1:
+            Z -= Z.mean(axis=-1, keepdims=True)
+            Z /= Z.std(axis=-1, keepdims=True)
+        return Z
+
+    # Normals from the next n points of the current Sobol sequence, one column per path.
+    # A new scrambled sequence is started with one dimension per normal of a path when needed
+    def generate_sobol_normals(self, shape):
+        dimension = 1 if len(shape) == 1 else shape[0]
+        if self.sobol is None or self.sobol.d != dimension:
+            self.sobol = qmc.Sobol(dimension, scramble=True, seed=self.generator)
+        u = self.sobol.random(shape[-1])
+        # scrambled points lie strictly inside (0, 1) in theory, guard against rounding to the edges
+        u = clip(u, 2.0 ** -53, 1.0 - 2.0 ** -53)
+        Z = ndtri(u).T
+        return Z.reshape(shape)
+
+    # Simulate n end-of-period spot prices in one step
+    def generate_terminal_values(self, S0, r, s, T, n, q=0.0):
+        Z = self.generate_normals((n,))
+        return S0 * exp((r - q - 0.5 * s ** 2) * T + s * math.sqrt(T) * Z)
+
+    # Time grid of the paths: the given times, or M uniform steps up to T
+    def get_times(self, T):
+        if self.times is not None:
+            return self.times
+        return T * arange(1, self.M + 1) / self.M
+
+    # Brownian increments of n paths on the time grid, returned as a (steps x n) matrix
+    # (built with the Brownian bridge for Sobol points)
+    def generate_increments(self, times, n):
+        steps = len(times)
+        if self.sampler == 'sobol' and self.config.brownian_bridge:
+            if self.bridge is None or not array_equal(self.bridge.times, times):
+                self.bridge = BrownianBridge(steps, times[-1], times)
+            return self.bridge.build_increments(self.generate_normals((steps, n)))
+        dt = diff(times, prepend=0.0)
+        return sqrt(dt)[:, newaxis] * self.generate_normals((steps, n))
+
+    # Simulate n paths with M time steps, returned as a (M+1) x n matrix
+    def generate_paths(self, S0, r, s, T, n, q=0.0):
+        times = self.get_times(T)
+        dt = diff(times, prepend=0.0)
+        S = empty((len(times) + 1, n))
+        S[0] = 0.0
+        S[1:] = ((r - q - 0.5 * s ** 2) * dt)[:, newaxis] + s * self.generate_increments(times, n)
+        cumsum(S, axis=0, out=S)
+        exp(S, out=S)
+        S *= S0
+        return S
+
+    # Generator yielding the simulation in blocks of at most chunk_size paths
+    # (an even number of paths with antithetic variates, so that every path keeps its mirror in the block)
+    def generate_chunks(self, S0, r, s, T, q=0.0, I=None):
+        remaining = self.I if I is None else I
+        while remaining > 0:
+            n = self.chunk_size if remaining > self.chunk_size else remaining
+            if self.antithetic:
+                n = n + (n % 2)
+            yield self.generate_block(S0, r, s, T, n, q)
+            remaining = remaining - n
+
+    # Simulate one block of n paths in the form of the engine's mode
+    def generate_block(self, S0, r, s, T, n, q=0.0):
+        if self.mode == 'terminal':
+            return self.generate_terminal_values(S0, r, s, T, n, q)
+        elif self.mode == 'increments':
+            return self.generate_increments(self.get_times(T), n)
+        return self.generate_paths(S0, r, s, T, n, q)
+
+    # Get the Monte Carlo estimate of the discounted payoff.
+    # payoff_function receives each block (terminal values or path matrix) and returns one payoff per path.
+    # control_function and control_mean give an optional control variate: its discounted payoff per path and its exact price.
+    # With target_std_error the simulation stops as soon as the standard error reaches the target, I is then the maximum
+    def calculate_discounted_payoff(self, S0, r, s, T, payoff_function, q=0.0,
+                                    control_function=None, control_mean=None, target_std_error=None):
+        discount = math.exp(-r * T)
+        
+        def new_estimate():
+            if control_function is None:
+                return MonteCarloEstimate()
+            return ControlVariateEstimate(control_mean)
+        
+        if self.sampler != 'sobol':
+            chunks = self.generate_chunks(S0, r, s, T, q)
+            return self.accumulate_discounted_payoff(chunks, new_estimate(), discount, payoff_function,
+                                                     control_function, target_std_error)
+        
+        # randomized QMC: the paths are split over the scrambled replicates, each replicate
+        # and each block is a power of two so the Sobol points keep their balance properties
+        replicates = self.config.replicates
+        I = 2 ** int(math.ceil(math.log2(math.ceil(self.I / replicates))))
+        if self.chunk_size < I:
+            self.chunk_size = 2 ** int(math.floor(math.log2(self.chunk_size)))
+        estimate = RandomizedQMCEstimate()
+        for replicate in range(replicates):
+            self.sobol = None
+            chunks = self.generate_chunks(S0, r, s, T, q, I)
+            estimate.add_replicate(self.accumulate_discounted_payoff(chunks, new_estimate(), discount,
+                                                                     payoff_function, control_function))
+            if target_std_error is not None and estimate.get_std_error() <= target_std_error:
+                break
+        
+        return estimate
+    
+    # Method that adds the discounted payoffs of a stream of blocks to the running estimate
+    def accumulate_discounted_payoff(self, chunks, estimate, discount, payoff_function,
+                                     control_function=None, target_std_error=None):
+        for block in chunks:
+            values = discount * payoff_function(block)
+            control_values = None if control_function is None else control_function(block)
+            # antithetic pairs are averaged first, the pair means are the independent samples
+            if self.antithetic:
+                half = values.size // 2
+                values = 0.5 * (values[:half] + values[half:])
+                if control_values is not None:
+                    control_values = 0.5 * (control_values[:half] + control_values[half:])
+            if control_values is None:
+                estimate.add(values)
+            else:
+                estimate.add(values, control_values)
+            if target_std_error is not None and estimate.get_std_error() <= target_std_error:
+                break
+        
+        return estimate
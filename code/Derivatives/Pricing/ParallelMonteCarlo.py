@@ -0,0 +1,71 @@
+import os
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+# Runs the Monte Carlo pricing of one product (its calculate_option_estimate_MC method)
+# on a share of the paths, in a worker process
+def calculate_partial_estimate(product, config, settings):
+    return product.calculate_option_estimate_MC(config, **settings)
+
+
+# Parallel Monte Carlo executor.
+# The path budget I of a configuration is split over the worker processes of a
+# concurrent.futures process pool, every share simulated with its own independent
+# sub-stream spawned from the configuration's seed. The partial running sums and
+# variances (or the randomized QMC replicates) are merged back into one estimate.
+# The pool is started on first use and kept for the following runs, so it should
+# be closed with shutdown() or by using the executor in a with statement.
+class ParallelMonteCarloExecutor:
+
+    def __init__(self, n_workers=None):
+        self.n_workers = n_workers if n_workers is not None else os.cpu_count()
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.shutdown()
+
+    def get_pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.n_workers)
+        return self.pool
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    # Method that splits a configuration into one configuration per worker with a share of the paths
+    # and its own sub-stream (the same split and sub-streams every time for a given seed)
+    def split_config(self, config):
+        n = self.n_workers if self.n_workers < config.I else config.I
+        streams = config.spawn(n)
+        return [stream.replace(I=config.I // n + (1 if k < config.I % n else 0)) for k, stream in enumerate(streams)]
+
+    # Method that prices several products at once: tasks is a list of (product, config, settings)
+    # and all the shares of all the products are queued on the pool together
+    def calculate_estimates(self, tasks):
+        pool = self.get_pool()
+        futures = []
+        for product, config, settings in tasks:
+            settings = dict(settings)
+            partitions = self.split_config(config)
+            # every worker stops at the precision that gives the target once the partial estimates are merged
+            if settings.get('target_std_error') is not None:
+                settings['target_std_error'] = settings['target_std_error'] * math.sqrt(len(partitions))
+            futures.append([pool.submit(calculate_partial_estimate, product, partition, settings)
+                            for partition in partitions])
+
+        estimates = []
+        for product_futures in futures:
+            estimate = product_futures[0].result()
+            for future in product_futures[1:]:
+                estimate.merge(future.result())
+            estimates.append(estimate)
+        return estimates
+
+    # Method that prices one product with its paths spread over the worker processes
+    def calculate_estimate(self, product, config, **settings):
+        return self.calculate_estimates([(product, config, settings)])[0]
@@ -0,0 +1,41 @@
+from collections import OrderedDict
+
+# Memory of pricing results keyed on the contract, the market data and the pricing method
+# (with its settings and Monte Carlo configuration), so that a repeated request is answered
+# without pricing again. The least recently used results are evicted beyond max_size entries.
+# Hits, misses and evictions are counted. Products only use a cache that is given to them
+# (see Option.set_pricing_cache), one cache can be shared by many products.
+class PricingCache:
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.results)
+
+    # Method that returns the result stored for the key, or calculates, stores and returns it
+    def get_or_calculate(self, key, calculate):
+        if key in self.results:
+            self.hits += 1
+            self.results.move_to_end(key)
+            return self.results[key]
+        self.misses += 1
+        result = calculate()
+        self.results[key] = result
+        if len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+            self.evictions += 1
+        return result
+
+    def clear(self):
+        self.results.clear()
+
+    # Counters of the cache, with the share of the requests answered from memory
+    def get_statistics(self):
+        requests = self.hits + self.misses
+        return {'size': len(self.results), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'hit_rate': self.hits / requests if requests else 0.0}
@@ -0,0 +1,65 @@
+from numpy import *
+
+# Value at Risk and Expected Shortfall from simulated or historical profit and loss scenarios.
+# The quantiles of equally likely scenarios are found with numpy.partition (linear time) instead of
+# a full sort, all the confidence levels of a run are placed in one partition of the losses.
+# Weighted scenarios (e.g. age-weighted historical simulation) are sorted once by loss.
+
+# One row of results per horizon (in years) and confidence level, VaR and ES are reported as positive losses
+RISK_DTYPE = dtype([('horizon', float64), ('confidence_level', float64), ('VaR', float64), ('ES', float64)])
+
+# Get the VaR and ES of an array of profit and loss scenarios at one or more confidence levels
+def calculate_VAR_ES(pnl, confidence_levels=0.95):
+    losses = -asarray(pnl, dtype=float64).ravel()
+    confidence_levels = atleast_1d(asarray(confidence_levels, dtype=float64))
+    n = len(losses)
+    # the VaR at level c is the smallest of the n(1-c) largest losses (as pnl[-500] of 10000 sorted scenarios at 95%),
+    # the ES the mean of these losses
+    tail = floor(n * (1 - confidence_levels) + 1e-9).astype(int64)
+    kth = n - maximum(tail, 1)
+    partitioned = partition(losses, unique(kth))
+    var = partitioned[kth]
+    es = array([partitioned[k:].mean() for k in kth])
+    return var, es
+
+# Get the VaR and ES of profit and loss scenarios with probabilities given by weights (summing to 1)
+def calculate_weighted_VAR_ES(pnl, weights, confidence_levels=0.95):
+    losses = -asarray(pnl, dtype=float64).ravel()
+    weights = asarray(weights, dtype=float64).ravel()
+    confidence_levels = atleast_1d(asarray(confidence_levels, dtype=float64))
+    order = argsort(losses)[::-1]
+    losses, weights = losses[order], weights[order] / weights.sum()
+    cumulative = cumsum(weights)
+    var = empty(len(confidence_levels))
+    es = empty(len(confidence_levels))
+    for i, level in enumerate(confidence_levels):
+        # the VaR is the smallest of the largest losses whose probability stays within 1-c (the floor(n(1-c))-th
+        # largest loss of calculate_VAR_ES for equal weights), at least the largest loss
+        k = int(searchsorted(cumulative, 1 - level + 1e-12, side='right')) - 1
+        k = k if k > 0 else 0
+        var[i] = losses[k]
+        # the ES is the probability-weighted mean of these losses
+        es[i] = (weights[:k + 1] @ losses[:k + 1]) / cumulative[k]
+    return var, es
+
+# Structured table of the VaR and ES of profit and loss scenarios per horizon (one row of pnl per horizon),
+# with weights (one row per horizon as well) the scenarios are weighted instead of equally likely
+def get_risk_table(pnl, horizons, confidence_levels, weights=None):
+    horizons = atleast_1d(asarray(horizons, dtype=float64))
+    confidence_levels = atleast_1d(asarray(confidence_levels, dtype=float64))
+    table = zeros(len(horizons) * len(confidence_levels), dtype=RISK_DTYPE)
+    for i, horizon in enumerate(horizons):
+        rows = table[i * len(confidence_levels):(i + 1) * len(confidence_levels)]
+        rows['horizon'] = horizon
+        rows['confidence_level'] = confidence_levels
+        if weights is None:
+            rows['VaR'], rows['ES'] = calculate_VAR_ES(pnl[i], confidence_levels)
+        else:
+            rows['VaR'], rows['ES'] = calculate_weighted_VAR_ES(pnl[i], weights[i], confidence_levels)
+    return table
+
+# Print a risk table in the style of the rest of the reports
+def print_risk_table(name, table):
+    for row in table:
+        print(name, '- horizon of', round(row['horizon'] * 252, 2), 'days at', round(100 * row['confidence_level'], 2),
+              '% C.I.: VAR', round(row['VaR'], 2), 'ES', round(row['ES'], 2))
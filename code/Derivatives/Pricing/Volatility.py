@@ -0,0 +1,155 @@
+from numpy import *
+from scipy.signal import lfilter
+
+# Historical volatility estimators for every ticker of a price history at once.
+# The returns are daily log returns in a (days x tickers) matrix, oldest first, and the volatilities
+# are annualized with the number of trading days per year:
+#   rolling  close-to-close standard deviation over a window of days,
+#   ewma     RiskMetrics exponentially weighted variance, sigma2[t+1] = decay*sigma2[t] + (1-decay)*r[t]^2,
+#   garch    GARCH(1,1) with variance targeting, sigma2[t+1] = omega + alpha*r[t]^2 + beta*sigma2[t],
+#            alpha and beta fitted by maximum likelihood per ticker.
+# A VolatilityEstimator keeps the state of one of them so that a new day updates it in O(1) per ticker.
+
+TRADING_DAYS = 252
+VOLATILITY_METHODS = ('rolling', 'ewma', 'garch')
+
+# Rolling close-to-close volatilities: row t uses the returns of days t to t+window-1
+def calculate_rolling_volatility(returns, window=21, annualization=TRADING_DAYS):
+    returns = asarray(returns, dtype=float64)
+    zero = zeros((1,) + returns.shape[1:])
+    sums = concatenate((zero, cumsum(returns, axis=0)))
+    squares = concatenate((zero, cumsum(returns ** 2, axis=0)))
+    window_sum = sums[window:] - sums[:-window]
+    window_squares = squares[window:] - squares[:-window]
+    variance = (window_squares - window_sum ** 2 / window) / (window - 1)
+    return sqrt(maximum(variance, 0) * annualization)
+
+# EWMA variances of daily returns: row t is the variance forecast for day t from the returns before it,
+# the last row (one more than the returns) the forecast for the next day
+def calculate_EWMA_variance(returns, decay=0.94):
+    returns = asarray(returns, dtype=float64)
+    # the recursion starts from the mean squared return of the first month
+    initial = mean(returns[:21] ** 2, axis=0)
+    variance = empty((len(returns) + 1,) + returns.shape[1:])
+    variance[0] = initial
+    variance[1:] = lfilter([1 - decay], [1, -decay], returns ** 2, axis=0, zi=decay * initial[newaxis] * ones((1,) + returns.shape[1:]))[0]
+    return variance
+
+# Annualized EWMA volatilities, see calculate_EWMA_variance
+def calculate_EWMA_volatility(returns, decay=0.94, annualization=TRADING_DAYS):
+    return sqrt(calculate_EWMA_variance(returns, decay) * annualization)
+
+# GARCH(1,1) variances of daily returns for arrays of parameters broadcast against the tickers,
+# with the long-run variance of every ticker as starting point. Returns the variance forecasts (one row more than
+# the returns, as calculate_EWMA_variance, only the last one without keep_variances) and the Gaussian log-likelihood
+def calculate_GARCH_variance(returns, alpha, beta, long_run_variance, keep_variances=True):
+    returns = asarray(returns, dtype=float64)
+    squared = returns ** 2
+    omega = long_run_variance * (1 - alpha - beta)
+    variance = broadcast_to(long_run_variance, broadcast(long_run_variance, alpha, beta).shape).astype(float64)
+    variances = empty((len(returns) + 1 if keep_variances else 1,) + variance.shape)
+    log_likelihood = zeros(variance.shape)
+    variances[0] = variance
+    for t in range(len(returns)):
+        log_likelihood -= 0.5 * (log(variance) + squared[t] / variance)
+        variance = omega + alpha * squared[t] + beta * variance
+        if keep_variances:
+            variances[t + 1] = variance
+    if not keep_variances:
+        variances[0] = variance
+    return variances, log_likelihood
+
+# Maximum likelihood estimates of the GARCH(1,1) alpha and beta of every ticker.
+# All the tickers are fitted together on a grid of alpha and persistence (alpha + beta), which is then
+# refined around the best point of each ticker
+def fit_GARCH(returns, grid_size=12, refinements=2):
+    returns = asarray(returns, dtype=float64)
+    if returns.ndim == 1:
+        returns = returns[:, newaxis]
+    long_run_variance = returns.var(axis=0)[:, newaxis]
+    n = returns.shape[1]
+
+    alpha_low, alpha_high = full(n, 0.005), full(n, 0.30)
+    persistence_low, persistence_high = full(n, 0.70), full(n, 0.999)
+    steps = linspace(0, 1, grid_size)
+    for refinement in range(refinements + 1):
+        alpha = (alpha_low[:, newaxis, newaxis] + (alpha_high - alpha_low)[:, newaxis, newaxis] * steps[newaxis, :, newaxis])
+        persistence = (persistence_low[:, newaxis, newaxis]
+                       + (persistence_high - persistence_low)[:, newaxis, newaxis] * steps[newaxis, newaxis, :])
+        alpha, persistence = broadcast_arrays(alpha, persistence)
+        alpha = minimum(alpha, persistence)
+        alpha, beta = alpha.reshape(n, -1), (persistence - alpha).reshape(n, -1)
+        log_likelihood = calculate_GARCH_variance(returns[:, :, newaxis], alpha, beta, long_run_variance, False)[1]
+        best = argmax(log_likelihood, axis=1)
+        best_alpha, best_persistence = alpha[arange(n), best], alpha[arange(n), best] + beta[arange(n), best]
+        # next grid: one step of the current grid on each side of the best point
+        alpha_step = (alpha_high - alpha_low) / (grid_size - 1)
+        persistence_step = (persistence_high - persistence_low) / (grid_size - 1)
+        alpha_low, alpha_high = maximum(best_alpha - alpha_step, 1e-4), best_alpha + alpha_step
+        persistence_low, persistence_high = maximum(best_persistence - persistence_step, alpha_low), minimum(best_persistence + persistence_step, 0.9999)
+
+    return best_alpha, best_persistence - best_alpha
+
+
+# Estimator of the current volatility of every ticker, fitted on a history of prices and then
+# updated day by day in O(1) per ticker: the rolling window keeps its running sums, EWMA and GARCH their last variance
+class VolatilityEstimator:
+
+    def __init__(self, method='ewma', window=21, decay=0.94, annualization=TRADING_DAYS):
+        if method not in VOLATILITY_METHODS:
+            print("Please give rolling, ewma or garch for the volatility estimator")
+        self.method = method
+        self.window = window
+        self.decay = decay
+        self.annualization = annualization
+
+    # Method that fits the estimator on a (days x tickers) matrix of prices, oldest first.
+    # Returns the annualized volatilities of the history (one row per day of the estimator)
+    def fit(self, prices):
+        prices = asarray(prices, dtype=float64)
+        if prices.ndim == 1:
+            prices = prices[:, newaxis]
+        returns = diff(log(prices), axis=0)
+        self.last_prices = prices[-1].copy()
+
+        if self.method == 'rolling':
+            # the returns of the last window days, in a ring buffer, with their running sums
+            self.buffer = returns[-self.window:].copy()
+            self.position = 0
+            self.window_sum = self.buffer.sum(axis=0)
+            self.window_squares = (self.buffer ** 2).sum(axis=0)
+            return calculate_rolling_volatility(returns, self.window, self.annualization)
+        elif self.method == 'garch':
+            self.alpha, self.beta = fit_GARCH(returns)
+            self.long_run_variance = returns.var(axis=0)
+            variances = calculate_GARCH_variance(returns[:, :, newaxis], self.alpha[:, newaxis], self.beta[:, newaxis],
+                                                 self.long_run_variance[:, newaxis])[0][:, :, 0]
+        else:
+            variances = calculate_EWMA_variance(returns, self.decay)
+        self.variance = variances[-1].copy()
+        return sqrt(variances * self.annualization)
+
+    # Method that updates the estimator with one new day of prices (one per ticker)
+    def update(self, prices):
+        prices = asarray(prices, dtype=float64)
+        returns = log(prices / self.last_prices)
+        self.last_prices = prices.copy()
+        if self.method == 'rolling':
+            oldest = self.buffer[self.position].copy()
+            self.buffer[self.position] = returns
+            self.position = (self.position + 1) % self.window
+            self.window_sum += returns - oldest
+            self.window_squares += returns ** 2 - oldest ** 2
+        elif self.method == 'garch':
+            self.variance = (self.long_run_variance * (1 - self.alpha - self.beta)
+                             + self.alpha * returns ** 2 + self.beta * self.variance)
+        else:
+            self.variance = self.decay * self.variance + (1 - self.decay) * returns ** 2
+        return self.get_volatility()
+
+    # Annualized volatility forecast of every ticker for the next day
+    def get_volatility(self):
+        if self.method == 'rolling':
+            variance = (self.window_squares - self.window_sum ** 2 / self.window) / (self.window - 1)
+            return sqrt(maximum(variance, 0) * self.annualization)
+        return sqrt(self.variance * self.annualization)
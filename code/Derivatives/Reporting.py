@@ -0,0 +1,53 @@
+from numpy import *
+
+# Graphs of the pricing and payoff results.
+# Kept apart from the pricing code and matplotlib is only imported when a graph is
+# actually drawn, so headless pricing never pays for (or blocks on) the GUI.
+
+# Graphs of the simulated paths, the end-of-period spot prices and the option values at time T
+def plot_simulated_paths(S, K, option_type):
+    from matplotlib import pyplot
+
+    # Graphical visualization of simulated paths
+    pyplot.title('Monte Carlo simulation scenarios')
+    pyplot.plot(S[:, :100])
+    pyplot.grid(True)
+    pyplot.xlabel('Steps')
+    pyplot.ylabel('Underlying Price level')
+    pyplot.show()
+
+    # Histogram of Underlying market value at time T
+    pyplot.title('Histogram: simulated end-of-period spot prices')
+    #pyplot.rcParams["figure.figsize"] = (10,3)
+    pyplot.hist(S[-1], bins=50)
+    pyplot.grid(True)
+    pyplot.xlabel('Underlying Price level')
+    pyplot.ylabel('frequency')
+    pyplot.show()
+
+    # Payoff of the Option at time T
+    pyplot.title('Histogram: simulated option values')
+    #pyplot.rcParams["figure.figsize"] = (10,3)
+    if option_type == 'call':
+        pyplot.hist(maximum(S[-1] - K, 0), bins=50)
+    elif option_type == 'put':
+        pyplot.hist(maximum(K - S[-1], 0), bins=50)
+    else:
+        print("Give a proper option type")
+
+    pyplot.grid(True)
+    pyplot.xlabel('option value')
+    pyplot.ylabel('frequency')
+    pyplot.ylim(0, 0.7 * S.shape[1])
+    pyplot.show()
+
+# Graph showing the option strategy
+def plot_payoff_strategy(name, spot_price_table, payoff):
+    from matplotlib import pyplot
+
+    pyplot.title(name)
+    pyplot.plot(spot_price_table, payoff)
+    pyplot.grid(True)
+    pyplot.xlabel('Price of the Underlying')
+    pyplot.ylabel('Profit & Loss')
+    pyplot.show()
@@ -167,7 +167,7 @@
     "option_1.calculate_option_price_BS_formula() \n",
     "\n",
     "# In this example the MC method has been used for the pricing of the Option 1\n",
-    "option_1.calculate_option_price_MC_BS() \n",
+    "option_1.calculate_option_price_MC_BS(plot=True) \n",
     "\n",
     "# Calculate Option 1 greeks: Delta, Gamma, Vega\n",
     "option_1.calculate_option_greeks()    \n",
@@ -246,7 +246,7 @@
     "# Option 2: Long call @9, 100 contracts of 100 options each\n",
     "\n",
     "# In this example the MC method has been used for the pricing of the Option 2\n",
-    "option_2.calculate_option_price_MC_BS()         \n",
+    "option_2.calculate_option_price_MC_BS(plot=True) \n",
     "\n",
     "# Calculate Option 2 greeks: Delta, Gamma, Vega\n",
     "option_2.calculate_option_greeks()       \n",
@@ -325,7 +325,7 @@
     "# Option 3: Long call @13, 100 contracts of 100 options each\n",
     "\n",
     "# In this example the MC method has been used for the pricing of the Option 3\n",
-    "option_3.calculate_option_price_MC_BS() \n",
+    "option_3.calculate_option_price_MC_BS(plot=True) \n",
     "\n",
     "# Calculate Option 3 greeks: Delta, Gamma, Vega\n",
     "option_3.calculate_option_greeks()  \n",
@@ -387,7 +387,7 @@
     }
    ],
    "source": [
-    "portfolio.calculate_payoff_strategy()"
+    "portfolio.calculate_payoff_strategy(plot=True)"
    ]
   },
   {
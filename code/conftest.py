@@ -0,0 +1 @@
+# The tests import the Derivatives package from this directory
@@ -0,0 +1,41 @@
+import pytest
+from numpy import array
+from Derivatives.Pricing.BlackScholes import calculate_option_price_BS_batch
+from Derivatives.Pricing.BarrierBlackScholes import calculate_barrier_option_price_BS_batch
+
+# Haug, "The Complete Guide to Option Pricing Formulas", table of standard barrier options:
+# S0 = 100, T = 0.5, r = 8%, q = 4%, s = 25%, rebate 3, strikes 90, 100 and 110
+HAUG_BARRIER_PRICES = [
+    ('down-and-out', 'call', 95, [9.0246, 6.7924, 4.8759]),
+    ('down-and-in', 'call', 95, [7.7627, 4.0109, 2.0576]),
+    ('up-and-out', 'call', 105, [2.6789, 2.3580, 2.3453]),
+    ('up-and-in', 'call', 105, [14.1112, 8.4482, 4.5910]),
+    ('down-and-out', 'put', 95, [2.2798, 2.2947, 2.6252]),
+    ('down-and-in', 'put', 95, [2.9586, 6.5677, 11.9752]),
+    ('up-and-out', 'put', 105, [3.7760, 5.4932, 7.5187]),
+    ('up-and-in', 'put', 105, [1.4653, 3.3721, 7.0846]),
+]
+STRIKES = array([90.0, 100.0, 110.0])
+
+@pytest.mark.parametrize('barrier_type, option_type, barrier, prices', HAUG_BARRIER_PRICES)
+def test_barrier_prices_match_haug(barrier_type, option_type, barrier, prices):
+    result = calculate_barrier_option_price_BS_batch(100, STRIKES, 0.5, 0.08, 0.25, option_type, barrier_type, barrier,
+                                                     q=0.04, rebate=3.0)
+    assert result == pytest.approx(prices, abs=1e-4)
+
+# Without rebate a knock-in and the knock-out of the same barrier add up to the plain vanilla option
+@pytest.mark.parametrize('direction, barrier', [('down', 95), ('up', 105), ('down', 80), ('up', 130)])
+@pytest.mark.parametrize('option_type', ['call', 'put'])
+def test_in_out_parity(direction, barrier, option_type):
+    arguments = (100, STRIKES, 0.5, 0.08, 0.25, option_type)
+    knock_in = calculate_barrier_option_price_BS_batch(*arguments, direction + '-and-in', barrier, q=0.04)
+    knock_out = calculate_barrier_option_price_BS_batch(*arguments, direction + '-and-out', barrier, q=0.04)
+    vanilla = calculate_option_price_BS_batch(*arguments, q=0.04)
+    assert knock_in + knock_out == pytest.approx(vanilla, abs=1e-10)
+
+# Contracts already beyond the barrier: knock-in options are plain vanilla, knock-out options are worth the rebate
+def test_breached_barrier():
+    arguments = (90, STRIKES, 0.5, 0.08, 0.25, 'call')
+    vanilla = calculate_option_price_BS_batch(*arguments, q=0.04)
+    assert calculate_barrier_option_price_BS_batch(*arguments, 'down-and-in', 95, q=0.04, rebate=3.0) == pytest.approx(vanilla)
+    assert calculate_barrier_option_price_BS_batch(*arguments, 'down-and-out', 95, q=0.04, rebate=3.0) == pytest.approx([3.0] * 3)
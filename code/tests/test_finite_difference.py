@@ -0,0 +1,33 @@
+import pytest
+from Derivatives.Pricing.BlackScholes import calculate_option_price_BS_batch, calculate_option_greeks_BS_batch
+from Derivatives.Pricing.BarrierBlackScholes import calculate_barrier_option_price_BS_batch
+from Derivatives.Pricing.FiniteDifference import solve_option_PDE, interpolate_PDE_surface
+
+# European options with the default grid against the Black & Scholes price and Greeks
+@pytest.mark.parametrize('S0, K, option_type', [(100, 100, 'call'), (100, 120, 'put'), (50, 40, 'call'), (100, 80, 'put')])
+def test_european_PDE_matches_black_scholes(S0, K, option_type):
+    values = interpolate_PDE_surface(solve_option_PDE(S0, K, 1, 0.05, 0.25, option_type), S0)
+    greeks = calculate_option_greeks_BS_batch(S0, K, 1, 0.05, 0.25, option_type)
+    
+    assert values['price'] == pytest.approx(float(calculate_option_price_BS_batch(S0, K, 1, 0.05, 0.25, option_type)), abs=1e-4)
+    assert values['delta'] == pytest.approx(float(greeks['delta']), abs=1e-5)
+    assert values['gamma'] == pytest.approx(float(greeks['gamma']), rel=1e-4)
+    assert values['theta'] == pytest.approx(float(greeks['theta']), rel=5e-3)
+
+# American puts against 30001-step extrapolated Leisen-Reimer trees
+@pytest.mark.parametrize('S0, K, T, r, s, reference', [(50, 50, 5 / 12, 0.1, 0.4, 4.284216), (36, 40, 1, 0.06, 0.2, 4.486675),
+                                                       (100, 110, 1, 0.05, 0.2, 11.972823)])
+def test_american_put_PDE_benchmark(S0, K, T, r, s, reference):
+    values = interpolate_PDE_surface(solve_option_PDE(S0, K, T, r, s, 'put', american=True), S0)
+    assert values['price'] == pytest.approx(reference, abs=1e-4)
+
+# Barrier options of Haug's table (S0 = 100, T = 0.5, r = 8%, q = 4%, s = 25%, rebate 3) against the closed form
+@pytest.mark.parametrize('barrier_type, option_type, barrier', [('down-and-out', 'call', 95), ('down-and-in', 'call', 95),
+                                                                ('up-and-out', 'call', 105), ('up-and-in', 'call', 105),
+                                                                ('down-and-out', 'put', 95), ('down-and-in', 'put', 95),
+                                                                ('up-and-out', 'put', 105), ('up-and-in', 'put', 105)])
+@pytest.mark.parametrize('K', [90, 100, 110])
+def test_barrier_PDE_matches_closed_form(barrier_type, option_type, barrier, K):
+    values = interpolate_PDE_surface(solve_option_PDE(100, K, 0.5, 0.08, 0.25, option_type, 0.04, barrier_type, barrier, 3.0), 100)
+    closed_form = calculate_barrier_option_price_BS_batch(100, K, 0.5, 0.08, 0.25, option_type, barrier_type, barrier, 0.04, 3.0)
+    assert values['price'] == pytest.approx(float(closed_form), abs=1e-4)
@@ -0,0 +1,27 @@
+import pytest
+from numpy import linspace
+from Derivatives.Pricing.BlackScholes import calculate_option_price_BS_batch
+from Derivatives.Pricing.Fourier import calculate_option_prices_FFT, calculate_option_prices_COS, calculate_option_surface_Fourier
+
+STRIKES = linspace(60, 150, 19)
+
+# Strike ladders of the Black & Scholes characteristic function against the closed form
+@pytest.mark.parametrize('option_type', ['call', 'put'])
+def test_fourier_prices_match_black_scholes(option_type):
+    closed_form = calculate_option_price_BS_batch(100, STRIKES, 0.75, 0.04, 0.3, option_type, q=0.01)
+    fft = calculate_option_prices_FFT(100, STRIKES, 0.75, 0.04, option_type, q=0.01, s=0.3)
+    cos = calculate_option_prices_COS(100, STRIKES, 0.75, 0.04, option_type, q=0.01, s=0.3)
+    assert fft == pytest.approx(closed_form, abs=1e-5)
+    assert cos == pytest.approx(closed_form, abs=1e-8)
+
+# Fang & Oosterlee's Heston benchmark (the Feller condition fails): S0 = K = 100, T = 1, r = q = 0, call 5.785155450
+@pytest.mark.parametrize('method, tolerance', [(calculate_option_prices_COS, 1e-6), (calculate_option_prices_FFT, 1e-6)])
+def test_heston_benchmark(method, tolerance):
+    price = method(100, 100, 1, 0.0, 'call', 'heston', v0=0.0175, kappa=1.5768, theta=0.0398, sigma=0.5751, rho=-0.5711)
+    assert float(price) == pytest.approx(5.785155450, abs=tolerance)
+
+# A surface has one ladder per maturity
+def test_fourier_surface():
+    surface = calculate_option_surface_Fourier(100, STRIKES, [0.25, 1.0], 0.04, 'call', s=0.3)
+    assert surface.shape == (2, len(STRIKES))
+    assert surface[1] == pytest.approx(calculate_option_price_BS_batch(100, STRIKES, 1.0, 0.04, 0.3, 'call'), abs=1e-8)
@@ -0,0 +1,18 @@
+import pytest
+from Derivatives.Options.PlainVanillaOption import PlainVanillaOption
+from Derivatives.Pricing.MonteCarloConfig import MonteCarloConfig
+from Derivatives.Pricing.Heston import HestonModel
+from Derivatives.Pricing.Fourier import calculate_option_prices_COS
+
+# Heston parameters of Fang & Oosterlee (the Feller condition fails), S0 = K = 100, T = 1, r = q = 0
+HESTON_PARAMETERS = {'v0': 0.0175, 'kappa': 1.5768, 'theta': 0.0398, 'sigma': 0.5751, 'rho': -0.5711}
+
+# The QE scheme on 50 steps against the COS price of the characteristic function
+@pytest.mark.parametrize('option_type', ['call', 'put'])
+@pytest.mark.parametrize('dtype', ['float64', 'float32'])
+def test_QE_price_matches_COS(option_type, dtype):
+    option = PlainVanillaOption(100, 100, 1, 0.0, 0.2, option_type, 'Long', 1, 1)
+    config = MonteCarloConfig(I=100000, M=50, seed=2024, dtype=dtype)
+    price = option.calculate_option_price_MC_BS(config, model=HestonModel(**HESTON_PARAMETERS))
+    reference = float(calculate_option_prices_COS(100, 100, 1, 0.0, option_type, 'heston', **HESTON_PARAMETERS))
+    assert price == pytest.approx(reference, abs=4 * option.std_error)
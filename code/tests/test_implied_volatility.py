@@ -0,0 +1,26 @@
+import pytest
+from numpy import array, isnan, meshgrid
+from Derivatives.Pricing.BlackScholes import calculate_option_price_BS_batch
+from Derivatives.Pricing.ImpliedVolatility import calculate_implied_volatility_batch
+
+# Volatilities recovered from Black & Scholes prices over strikes deep in and out of the money,
+# short and long maturities and low to high volatilities
+@pytest.mark.parametrize('option_type', ['call', 'put'])
+def test_implied_volatility_round_trip(option_type):
+    K, T, s = (x.ravel() for x in meshgrid(array([60.0, 90.0, 100.0, 110.0, 150.0]), array([0.05, 0.5, 2.0]),
+                                          array([0.05, 0.2, 0.6, 1.5]), indexing='ij'))
+    price = calculate_option_price_BS_batch(100, K, T, 0.03, s, option_type, q=0.01)
+    # quotes whose time value is lost in rounding have no volatility to recover
+    time_value = price - calculate_option_price_BS_batch(100, K, T, 0.03, 1e-4, option_type, q=0.01)
+    quoted = time_value > 1e-8 * price.clip(1)
+
+    volatility, converged = calculate_implied_volatility_batch(price, 100, K, T, 0.03, option_type, q=0.01)
+
+    assert converged[quoted].all()
+    assert volatility[quoted] == pytest.approx(s[quoted], rel=1e-6)
+
+# Quotes outside the no-arbitrage bounds get nan and are flagged as not converged
+def test_implied_volatility_outside_bounds():
+    volatility, converged = calculate_implied_volatility_batch(array([150.0, 0.0]), 100, 100, 1, 0.05, 'call')
+    assert isnan(volatility).all()
+    assert not converged.any()
@@ -0,0 +1,31 @@
+import pytest
+from Derivatives.Pricing.BlackScholes import calculate_option_price_BS_batch, calculate_option_greeks_BS_batch
+from Derivatives.Pricing.Lattice import calculate_option_price_lattice
+
+# European options of the Leisen-Reimer tree (u*d != 1) against the Black & Scholes price and Greeks
+@pytest.mark.parametrize('S0, K', [(100, 130), (100, 80), (50, 60), (100, 100)])
+@pytest.mark.parametrize('option_type', ['call', 'put'])
+def test_leisen_reimer_greeks_match_black_scholes(S0, K, option_type):
+    T, r, s = 0.25, 0.05, 0.4
+    result = calculate_option_price_lattice(S0, K, T, r, s, option_type, method='leisen_reimer', american=False)
+    greeks = calculate_option_greeks_BS_batch(S0, K, T, r, s, option_type)
+    
+    assert result['price'] == pytest.approx(float(calculate_option_price_BS_batch(S0, K, T, r, s, option_type)), abs=1e-3)
+    assert result['delta'] == pytest.approx(float(greeks['delta']), abs=1e-3)
+    assert result['gamma'] == pytest.approx(float(greeks['gamma']), rel=2e-2)
+    assert result['theta'] == pytest.approx(float(greeks['theta']), rel=1e-2)
+
+# Hull's American put (S0 = K = 50, T = 5 months, r = 10%, s = 40%) with 200 steps, reference from a 30001-step
+# extrapolated Leisen-Reimer tree
+@pytest.mark.parametrize('method, tolerance', [('crr', 3e-3), ('leisen_reimer', 3e-4), ('trinomial', 5e-4)])
+def test_american_put_benchmark(method, tolerance):
+    result = calculate_option_price_lattice(50, 50, 5 / 12, 0.1, 0.4, 'put', N=200, method=method, american=True)
+    assert result['price'] == pytest.approx(4.284216, abs=tolerance)
+
+# Richardson extrapolation is on by default only for the Leisen-Reimer tree
+def test_richardson_default_only_for_leisen_reimer():
+    arguments = (50, 50, 5 / 12, 0.1, 0.4, 'put')
+    assert (calculate_option_price_lattice(*arguments, method='crr') ==
+            calculate_option_price_lattice(*arguments, method='crr', richardson=False))
+    assert (calculate_option_price_lattice(*arguments, method='leisen_reimer') ==
+            calculate_option_price_lattice(*arguments, method='leisen_reimer', richardson=True))
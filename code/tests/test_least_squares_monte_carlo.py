@@ -0,0 +1,21 @@
+import pytest
+from Derivatives.Pricing.MonteCarloConfig import MonteCarloConfig
+from Derivatives.Pricing.LeastSquaresMonteCarlo import calculate_option_estimate_LSM
+from Derivatives.Pricing.BlackScholes import calculate_option_price_BS_batch
+
+# Longstaff & Schwartz's American put (S0 = 36, K = 40, T = 1, r = 6%, s = 20%) exercisable 50 times a year.
+# The reference 4.487 is the American price of a 30001-step extrapolated Leisen-Reimer tree, the Bermudan option
+# and the low-biased out-of-sample estimate are about 0.01 below it
+@pytest.mark.parametrize('basis', ['laguerre', 'polynomial'])
+def test_american_put_LSM_benchmark(basis):
+    estimate = calculate_option_estimate_LSM(36, 40, 1, 0.06, 0.2, 'put', MonteCarloConfig(I=100000, M=50, seed=2024),
+                                             basis=basis)
+    assert estimate.get_price() == pytest.approx(4.487, abs=0.01 + 4 * estimate.get_std_error())
+    assert estimate.get_price() < 4.487 + 2 * estimate.get_std_error()
+
+# With a single exercise date at maturity the option is European
+def test_european_LSM_matches_black_scholes():
+    estimate = calculate_option_estimate_LSM(36, 40, 1, 0.06, 0.2, 'put', MonteCarloConfig(I=100000, M=50, seed=2024),
+                                             exercise_times=[])
+    assert estimate.get_price() == pytest.approx(float(calculate_option_price_BS_batch(36, 40, 1, 0.06, 0.2, 'put')),
+                                                 abs=4 * estimate.get_std_error())
@@ -0,0 +1,96 @@
+import os
+import json
+import shutil
+import pytest
+from numpy import array, array_equal, datetime64
+from Derivatives.MarketData import MarketData, DEFAULT_DATA_FILE
+
+NEW_DATES = ['22/02/2021', '23/02/2021']
+
+@pytest.fixture
+def data_file(tmp_path):
+    file_name = str(tmp_path / 'stocks_data.csv')
+    shutil.copyfile(DEFAULT_DATA_FILE, file_name)
+    return file_name
+
+# Method that makes the loads after it fail if they parse the csv file instead of mapping the cache
+def forbid_parsing(monkeypatch):
+    def parse_csv(self, file_name):
+        raise AssertionError('the csv file was parsed again')
+    monkeypatch.setattr(MarketData, 'parse_csv', parse_csv)
+
+def get_new_prices(data):
+    return array([data.prices[-1] * 1.01, data.prices[-1] * 1.02])
+
+# The first load writes the cache, later loads map it with the same dates and prices as the csv
+def test_cache_matches_csv(data_file, monkeypatch):
+    parsed = MarketData(data_file, use_cache=False)
+    MarketData(data_file)
+    with open(os.path.splitext(data_file)[0] + '.cache.json') as metadata_file:
+        assert json.load(metadata_file)['days'] == len(parsed.dates)
+    
+    forbid_parsing(monkeypatch)
+    cached = MarketData(data_file)
+    assert cached.tickers == parsed.tickers
+    assert array_equal(cached.dates, parsed.dates)
+    assert array_equal(cached.prices, parsed.prices)
+    assert (cached.dates[1:] > cached.dates[:-1]).all()
+
+# A csv file that is only touched keeps its cache, a changed csv file rebuilds it
+def test_cache_invalidation(data_file, monkeypatch):
+    days = len(MarketData(data_file).dates)
+    status = os.stat(data_file)
+    os.utime(data_file, ns=(status.st_atime_ns, status.st_mtime_ns + 10**9))
+    with monkeypatch.context() as patch:
+        forbid_parsing(patch)
+        MarketData(data_file)
+    
+    with open(data_file) as csv_file:
+        lines = csv_file.readlines()
+    with open(data_file, 'w') as csv_file:
+        csv_file.writelines(lines[:1] + lines[2:])
+    rebuilt = MarketData(data_file)
+    assert len(rebuilt.dates) == days - 1
+    assert rebuilt.dates[-1] == datetime64('2021-02-18')
+
+# Appended days are in the cache of the next load, without parsing the csv again
+@pytest.mark.parametrize('use_cache', [True, False])
+def test_append_prices(data_file, monkeypatch, use_cache):
+    data = MarketData(data_file, use_cache)
+    days = len(data.dates)
+    new_prices = get_new_prices(data)
+    data.append_prices(NEW_DATES, new_prices)
+    
+    assert len(data.dates) == len(data.prices) == days + 2
+    assert data.dates[-1] == datetime64('2021-02-23')
+    assert array_equal(data.prices[-2:], new_prices.astype(data.prices.dtype))
+    if use_cache:
+        forbid_parsing(monkeypatch)
+        reloaded = MarketData(data_file)
+        assert array_equal(reloaded.dates, data.dates)
+        assert array_equal(reloaded.prices, data.prices)
+
+# Days that are not after the last one are refused
+def test_append_prices_refuses_old_dates(data_file):
+    data = MarketData(data_file)
+    days = len(data.dates)
+    data.append_prices(['19/02/2021'], data.prices[-1])
+    assert len(data.dates) == days
+
+# Rows left at the end of the .npy files by an append that stopped before its metadata was written are not mapped,
+# and the next append writes over them
+def test_append_after_interrupted_append(data_file, monkeypatch):
+    data = MarketData(data_file)
+    days = len(data.dates)
+    new_prices = get_new_prices(data)
+    monkeypatch.setattr(MarketData, 'save_metadata', lambda self, metadata: None)
+    data.append_prices(NEW_DATES, new_prices)
+    monkeypatch.undo()
+    
+    forbid_parsing(monkeypatch)
+    reloaded = MarketData(data_file)
+    assert len(reloaded.dates) == len(reloaded.prices) == days
+    reloaded.append_prices(NEW_DATES[1:], new_prices[1:])
+    again = MarketData(data_file)
+    assert len(again.dates) == days + 1
+    assert array_equal(again.prices[-1], new_prices[1].astype(again.prices.dtype))
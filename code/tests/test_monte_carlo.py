@@ -0,0 +1,39 @@
+import pytest
+from Derivatives.Options.PlainVanillaOption import PlainVanillaOption
+from Derivatives.Options.BarrierOption import BarrierOption
+from Derivatives.Pricing.MonteCarloConfig import MonteCarloConfig
+from Derivatives.Pricing.BlackScholes import calculate_option_price_BS_batch
+
+# Seeded Monte Carlo prices within four standard errors of the Black & Scholes price, for every variance reduction
+@pytest.mark.parametrize('settings', [{}, {'antithetic': True}, {'moment_matching': True}, {'control_variate': True},
+                                      {'mode': 'path'}])
+@pytest.mark.parametrize('option_type', ['call', 'put'])
+def test_MC_price_matches_black_scholes(settings, option_type):
+    option = PlainVanillaOption(100, 105, 1, 0.05, 0.2, option_type, 'Long', 1, 1)
+    price = option.calculate_option_price_MC_BS(MonteCarloConfig(I=50000, M=10, seed=2024), **settings)
+    assert price == pytest.approx(float(calculate_option_price_BS_batch(100, 105, 1, 0.05, 0.2, option_type)),
+                                  abs=4 * option.std_error)
+
+# Randomized quasi-Monte Carlo over Sobol replicates, with the Brownian bridge on the path grid
+@pytest.mark.parametrize('mode', ['terminal', 'path'])
+def test_QMC_price_matches_black_scholes(mode):
+    option = PlainVanillaOption(100, 105, 1, 0.05, 0.2, 'call', 'Long', 1, 1)
+    price = option.calculate_option_price_MC_BS(MonteCarloConfig(I=2**15, M=10, seed=2024, sampler='sobol'), mode)
+    assert option.std_error < 0.005
+    assert price == pytest.approx(float(calculate_option_price_BS_batch(100, 105, 1, 0.05, 0.2, 'call')),
+                                  abs=4 * option.std_error)
+
+# The same seed gives the same price bit for bit
+def test_MC_price_is_reproducible():
+    option = PlainVanillaOption(100, 105, 1, 0.05, 0.2, 'call', 'Long', 1, 1)
+    config = MonteCarloConfig(I=20000, M=10, seed=7, chunk_size=3000)
+    assert option.calculate_option_price_MC_BS(config) == option.calculate_option_price_MC_BS(config)
+
+# Continuously monitored barrier options on 50 steps with the Brownian bridge correction, against the closed form
+@pytest.mark.parametrize('barrier_type, option_type, barrier', [('down-and-out', 'call', 95), ('up-and-in', 'put', 105),
+                                                                ('up-and-out', 'call', 105)])
+def test_barrier_MC_price_matches_closed_form(barrier_type, option_type, barrier):
+    option = BarrierOption(100, 100, 0.5, 0.08, 0.25, option_type, 'Long', 1, 1, barrier_type, barrier, 0.04, 3.0)
+    closed_form = option.calculate_option_price_BS_formula()
+    price = option.calculate_option_price_MC_BS(MonteCarloConfig(I=50000, M=50, seed=2024), control_variate=True)
+    assert price == pytest.approx(closed_form, abs=4 * option.std_error)
@@ -0,0 +1,70 @@
+import pytest
+from Derivatives.Options.PlainVanillaOption import PlainVanillaOption
+from Derivatives.Options.BarrierOption import BarrierOption
+from Derivatives.Pricing.MonteCarloConfig import MonteCarloConfig
+from Derivatives.Pricing.PricingCache import PricingCache
+
+def get_option(K=100, s=0.2):
+    return PlainVanillaOption(100, K, 1, 0.05, s, 'call', 'Long', 1, 1)
+
+# A repeated request is answered from the cache, also for another option object with the same contract and market data
+def test_repeated_price_is_a_hit():
+    cache = PricingCache()
+    first, second = get_option(), get_option()
+    first.set_pricing_cache(cache)
+    second.set_pricing_cache(cache)
+    
+    assert first.calculate_option_price_BS_formula() == second.calculate_option_price_BS_formula()
+    assert cache.get_statistics()['hits'] == 1
+    assert cache.get_statistics()['misses'] == 1
+
+# The contract, the market data and the pricing method with its settings all take part in the key
+def test_key_separates_contracts_market_data_and_methods():
+    cache = PricingCache()
+    for option in (get_option(), get_option(K=110), get_option(s=0.3)):
+        option.set_pricing_cache(cache)
+        option.calculate_option_price_BS_formula()
+        option.calculate_option_price_lattice(N=100)
+        option.calculate_option_price_lattice(N=100, american=False)
+    assert cache.get_statistics()['misses'] == 9
+    assert cache.get_statistics()['hits'] == 0
+
+# The barrier parameters are part of the key of barrier options
+def test_barrier_parameters_in_key():
+    cache = PricingCache()
+    prices = []
+    for barrier in (90, 95):
+        option = BarrierOption(100, 100, 0.5, 0.08, 0.25, 'call', 'Long', 1, 1, 'down-and-out', barrier, 0.04)
+        option.set_pricing_cache(cache)
+        prices.append(option.calculate_option_price_BS_formula())
+    assert prices[0] != prices[1]
+    assert len(cache) == 2
+
+# Seeded Monte Carlo runs are replayed from the cache, runs without a seed (no configuration) are never cached,
+# and another seed or setting is another key
+def test_MC_keys():
+    cache = PricingCache()
+    option = get_option()
+    option.set_pricing_cache(cache)
+    config = MonteCarloConfig(I=10000, M=10, seed=1)
+    
+    price = option.calculate_option_price_MC_BS(config)
+    assert option.calculate_option_price_MC_BS(MonteCarloConfig(I=10000, M=10, seed=1)) == price
+    assert cache.hits == 1
+    option.calculate_option_price_MC_BS(config.replace(seed_sequence=MonteCarloConfig(seed=2).seed_sequence))
+    option.calculate_option_price_MC_BS(config, antithetic=True)
+    option.calculate_option_price_MC_BS()
+    option.calculate_option_price_MC_BS()
+    assert cache.misses == 3
+    assert len(cache) == 3
+
+# The least recently used results are evicted beyond max_size
+def test_eviction():
+    cache = PricingCache(max_size=2)
+    options = [get_option(K) for K in (90, 100, 110)]
+    for option in options:
+        option.set_pricing_cache(cache)
+        option.calculate_option_price_BS_formula()
+    options[1].calculate_option_price_BS_formula()
+    options[0].calculate_option_price_BS_formula()
+    assert cache.get_statistics() == {'size': 2, 'max_size': 2, 'hits': 1, 'misses': 4, 'evictions': 2, 'hit_rate': 0.2}
@@ -0,0 +1,16 @@
+import pytest
+from numpy import array, ones, random
+from Derivatives.Pricing.ValueAtRisk import calculate_VAR_ES, calculate_weighted_VAR_ES
+
+# With equal weights the weighted VaR and ES are those of the equally likely scenarios,
+# also when n(1-c) is not a whole number of scenarios
+@pytest.mark.parametrize('n', [1683, 1000, 37, 10])
+def test_weighted_VAR_ES_with_equal_weights_match_unweighted(n):
+    pnl = random.default_rng(n).standard_normal(n)
+    confidence_levels = array([0.9, 0.95, 0.975, 0.99, 0.999])
+    
+    var, es = calculate_VAR_ES(pnl, confidence_levels)
+    weighted_var, weighted_es = calculate_weighted_VAR_ES(pnl, ones(n), confidence_levels)
+    
+    assert weighted_var == pytest.approx(var)
+    assert weighted_es == pytest.approx(es)